@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database import neo4j_conn
+from settings import AUDIT_HOST, AUDIT_PORT, AUDIT_RELOAD_INTERVAL, INGEST_MARKER
+from versions import version_key
+
+SNAPSHOT_QUERY = """
+MATCH (p:Plugin)-[:HAS_VULNERABILITY]->(v:Vulnerability)
+RETURN p.slug AS slug, v.id AS id, v.title AS title, v.vuln_type AS vuln_type,
+       v.score AS score, v.severity AS severity, v.introduced_in AS introduced_in,
+       v.fixed_in AS fixed_in, v.introduced_in_key AS introduced_in_key, v.fixed_in_key AS fixed_in_key
+"""
+
+# Clave que ordena las vulnerabilidades sin corregir después de cualquier versión
+UNFIXED = "~"
+
+
+def validate_items(items):
+    """
+    Comprueba que un lote tiene el formato que acepta VulnerabilitySnapshot.audit.
+    Devuelve el mensaje de error, o None si el lote es válido.
+    """
+    if not isinstance(items, list):
+        return "El lote debe ser una lista"
+    for position, item in enumerate(items):
+        if isinstance(item, dict):
+            slug, version = item.get("slug"), item.get("version")
+        elif isinstance(item, list) and len(item) == 3:
+            _, slug, version = item
+        else:
+            return f"Elemento {position}: se espera {{site, slug, version}} o [site, slug, version]"
+        if not slug or not isinstance(slug, str) or not version or not isinstance(version, str):
+            return f"Elemento {position}: slug y version son obligatorios"
+    return None
+
+
+class VulnerabilitySnapshot:
+    """
+    Copia en memoria de las relaciones Plugin -> Vulnerability: para cada slug, las
+    vulnerabilidades ordenadas por la clave de la versión que las corrige. Una
+    consulta slug@versión es una búsqueda binaria sobre esa lista.
+    """
+
+    def __init__(self, rows):
+        by_slug = {}
+        for r in rows:
+            by_slug.setdefault(r["slug"], []).append(r)
+
+        self.plugins = {}
+        for slug, vulns in by_slug.items():
+            vulns.sort(key=lambda r: r["fixed_in_key"] or UNFIXED)
+            fixed_keys = [r["fixed_in_key"] or UNFIXED for r in vulns]
+            self.plugins[slug] = (fixed_keys, vulns)
+        self.vulnerabilities = len(rows)
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls):
+        return cls(neo4j_conn.fetch_query(SNAPSHOT_QUERY))
+
+    def affected(self, slug, version):
+        """Devuelve las vulnerabilidades de 'slug' que afectan a 'version'."""
+        entry = self.plugins.get(slug)
+        key = version_key(version)
+        if entry is None or key is None:
+            return []
+        fixed_keys, vulns = entry
+        # Las corregidas en una versión <= 'version' quedan a la izquierda
+        start = bisect_right(fixed_keys, key)
+        return [
+            {name: v[name] for name in ("id", "title", "vuln_type", "score", "severity", "introduced_in", "fixed_in")}
+            for v in vulns[start:]
+            if v["introduced_in_key"] is None or v["introduced_in_key"] <= key
+        ]
+
+    def audit(self, items):
+        """
+        Resuelve un lote de elementos {"site", "slug", "version"} (o listas
+        [site, slug, version]) y devuelve uno por elemento con sus vulnerabilidades.
+        """
+        results = []
+        for item in items:
+            if isinstance(item, dict):
+                site, slug, version = item.get("site"), item.get("slug"), item.get("version")
+            else:
+                site, slug, version = item
+            results.append({"site": site, "slug": slug, "version": version,
+                            "vulnerabilities": self.affected(slug, version)})
+        return results
+
+    def stats(self):
+        return {"plugins": len(self.plugins), "vulnerabilities": self.vulnerabilities, "loaded_at": self.loaded_at}
+
+
+class AuditService:
+    """
+    Mantiene el snapshot vigente y lo recarga cuando la ingesta actualiza el fichero
+    marcador (populate_db lo toca al terminar) o cuando se pide explícitamente.
+    """
+
+    def __init__(self, marker=INGEST_MARKER, interval=AUDIT_RELOAD_INTERVAL):
+        self.marker = marker
+        self.interval = interval
+        self._marker_mtime = self._mtime()
+        self.snapshot = VulnerabilitySnapshot.load()
+        self._lock = threading.Lock()
+        print(f"Snapshot cargado: {self.snapshot.stats()}")
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.marker)
+        except (OSError, TypeError):
+            return None
+
+    def reload(self):
+        with self._lock:
+            snapshot = VulnerabilitySnapshot.load()
+            self.snapshot = snapshot  # El cambio de referencia es atómico para los lectores
+        print(f"Snapshot recargado: {snapshot.stats()}")
+        return snapshot.stats()
+
+    def watch(self):
+        """Hilo en segundo plano que vigila el marcador de fin de ingesta."""
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                mtime = self._mtime()
+                if mtime is not None and mtime != self._marker_mtime:
+                    self._marker_mtime = mtime
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        print(f"No se pudo recargar el snapshot: {e}")
+        threading.Thread(target=loop, daemon=True).start()
+
+
+def make_handler(service):
+    class AuditHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, service.snapshot.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path == "/reload":
+                self._send(200, service.reload())
+                return
+            if self.path != "/audit":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                items = json.loads(self.rfile.read(length) or b"[]")
+            except ValueError:
+                self._send(400, {"error": "JSON no válido"})
+                return
+            error = validate_items(items)
+            if error:
+                self._send(400, {"error": error})
+                return
+            self._send(200, service.snapshot.audit(items))
+
+        def log_message(self, format, *args):
+            pass
+
+    return AuditHandler
+
+
+def serve(host=AUDIT_HOST, port=AUDIT_PORT):
+    service = AuditService()
+    service.watch()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Servicio de auditoría escuchando en http://{host}:{port} (POST /audit, POST /reload, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auditoría masiva de plugins instalados en varios sitios.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Arranca el servicio HTTP local")
+    sub.add_parser("audit", help="Lee un lote JSON de stdin y escribe el resultado en stdout")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve()
+    else:
+        items = json.load(sys.stdin)
+        error = validate_items(items)
+        if error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        snapshot = VulnerabilitySnapshot.load()
+        json.dump(snapshot.audit(items), sys.stdout, indent=2)
@@ -0,0 +1,219 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import populate_db
+import wpscan_scraper
+from database import neo4j_conn
+from fake_services import FakeServices, SyntheticCorpus
+from scheduler import QuotaScheduler
+from settings import SCHEDULER_WEIGHTS
+from sync import StalenessPolicy
+from wpscan_api import wpscan, wordpress
+
+# Benchmark de la ingesta contra servicios locales (fake_services). Mide cada etapa
+# (registros por segundo, pico de memoria, viajes a Neo4j y peticiones HTTP) y
+# compara el resultado con una ejecución anterior guardada con --output.
+#
+#   python benchmark.py --plugins 5000 --output bench.json
+#   python benchmark.py --plugins 5000 --baseline bench.json --threshold 0.2
+#
+# Necesita una base de datos Neo4j de pruebas: con --wipe se vacía antes de empezar.
+
+STAGES = ["harvest_slugs", "check_plugins", "check_versions", "fetch_all_plugins"]
+
+
+class RoundTripCounter:
+    """Envuelve los métodos de neo4j_conn para contar los viajes a la base de datos."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.count = 0
+        self._originals = {}
+
+    def install(self):
+        for name in ("query", "fetch_query"):
+            original = getattr(self.conn, name)
+            self._originals[name] = original
+            setattr(self.conn, name, self._counted(original))
+
+        write_batches = self.conn.write_batches
+        self._originals["write_batches"] = write_batches
+
+        def counted_write_batches(statements, batch_size=populate_db.NEO4J_BATCH_SIZE):
+            # Una transacción por llamada, pero un viaje por cada trozo de cada sentencia
+            statements = [(query, rows) for query, rows in statements]
+            self.count += sum(-(-len(rows) // batch_size) for _, rows in statements if rows)
+            return write_batches(statements, batch_size)
+
+        self.conn.write_batches = counted_write_batches
+        return self
+
+    def _counted(self, func):
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def uninstall(self):
+        for name, original in self._originals.items():
+            setattr(self.conn, name, original)
+
+
+def point_at(services):
+    """Redirige los clientes de WPScan, wordpress.org y wpscan.com al servidor local."""
+    wpscan.base_url = f"{services.url}/api/v3"
+    wordpress.base_url = f"{services.url}/plugins/info/1.2/"
+    wordpress.releases_url = f"{services.url}/download/releases/"
+    wpscan_scraper.BASE_URL = f"{services.url}/plugins"
+    for client in (wpscan.client, wordpress.client):
+        # Sin caché, sin límite de ritmo y sin cuota: se mide la ingesta, no la espera
+        client.cache = None
+        client.bucket.rate = None
+        client.quota_remaining = None
+
+
+def measure(name, func, counter, services, trace_memory=True):
+    """Ejecuta una etapa y devuelve sus métricas. 'func' devuelve el número de registros."""
+    requests_before = sum(services.requests.values())
+    trips_before = counter.count
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    records = func()
+    seconds = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    result = {
+        "records": records,
+        "seconds": round(seconds, 3),
+        "records_per_second": round(records / seconds, 2) if seconds else None,
+        "peak_memory_mb": round(peak / 2 ** 20, 2) if trace_memory else None,
+        "neo4j_round_trips": counter.count - trips_before,
+        "http_requests": sum(services.requests.values()) - requests_before,
+    }
+    print(f"{name}: {records} registros en {result['seconds']} s ({result['records_per_second']} reg/s), "
+          f"pico de memoria {result['peak_memory_mb']} MB, {result['neo4j_round_trips']} viajes a Neo4j, "
+          f"{result['http_requests']} peticiones HTTP")
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Devuelve las regresiones respecto a 'baseline': etapas cuyo rendimiento baja, o
+    cuya memoria o número de viajes a Neo4j sube, más de 'threshold' (0.2 = 20 %).
+    """
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        checks = [
+            ("records_per_second", -1),
+            ("peak_memory_mb", 1),
+            ("neo4j_round_trips", 1),
+        ]
+        for metric, direction in checks:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction > threshold:
+                regressions.append(f"{stage}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def run_benchmark(args):
+    corpus = SyntheticCorpus(plugins=args.plugins, vulns_per_plugin=args.vulns_per_plugin,
+                             versions=args.versions, core_vulns=args.core_vulns, seed=args.seed)
+    services = FakeServices(corpus, fixtures_dir=args.fixtures, latency=args.latency,
+                            error_rate=args.error_rate, quota=args.quota).start()
+    point_at(services)
+    counter = RoundTripCounter(neo4j_conn).install()
+
+    if args.wipe:
+        print("Vaciando la base de datos de pruebas...")
+        neo4j_conn.query("MATCH (n) WHERE NOT n:SchemaMigration DETACH DELETE n")
+    populate_db.migrate()
+
+    # Con max_age_days=0 se refresca todo lo que ya existe: una segunda pasada mide
+    # el camino de "sin cambios" en lugar de saltarse los plugins
+    policy = StalenessPolicy(max_age_days=0) if args.refresh_all else None
+    slugs = []
+
+    def harvest():
+        slugs.extend(wpscan_scraper.harvest_slugs(workers=args.workers, checkpoint_path=None, rate=None))
+        return len(slugs)
+
+    def plugins():
+        stats = populate_db.check_plugins(slugs or corpus.slugs, policy=policy,
+                                          scheduler=QuotaScheduler(SCHEDULER_WEIGHTS))
+        return stats["written"]
+
+    def versions():
+        stats = populate_db.check_versions(wordpress.get_all_versions(), policy=policy)
+        return stats["written"] if stats else 0
+
+    def catalogue():
+        return populate_db.fetch_all_plugins()
+
+    runners = {"harvest_slugs": harvest, "check_plugins": plugins,
+               "check_versions": versions, "fetch_all_plugins": catalogue}
+    results = {
+        "scale": {"plugins": args.plugins, "vulns_per_plugin": args.vulns_per_plugin, "versions": args.versions,
+                  "core_vulns": args.core_vulns, "latency": args.latency, "error_rate": args.error_rate,
+                  "fixtures": args.fixtures},
+        "stages": {},
+    }
+    try:
+        for stage in args.stages:
+            results["stages"][stage] = measure(stage, runners[stage], counter, services, not args.no_memory)
+    finally:
+        counter.uninstall()
+        services.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la ingesta contra servicios locales.")
+    parser.add_argument("--plugins", type=int, default=1000, help="Plugins del corpus sintético")
+    parser.add_argument("--vulns-per-plugin", type=int, default=5)
+    parser.add_argument("--versions", type=int, default=100, help="Versiones de WordPress del corpus sintético")
+    parser.add_argument("--core-vulns", type=int, default=50, help="Vulnerabilidades del núcleo compartidas entre versiones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada por petición, en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de peticiones que responden 503")
+    parser.add_argument("--quota", type=int, help="Cuota diaria simulada de WPScan (por defecto sin límite)")
+    parser.add_argument("--fixtures", help="Directorio con respuestas grabadas (ver fake_services.record_corpus)")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos del extractor de slugs")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--wipe", action="store_true", help="Vacía la base de datos antes de empezar")
+    parser.add_argument("--no-refresh-all", dest="refresh_all", action="store_false",
+                        help="Respeta la política de refresco en lugar de refrescarlo todo")
+    parser.add_argument("--no-memory", action="store_true", help="No mide la memoria (tracemalloc ralentiza)")
+    parser.add_argument("--output", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--baseline", help="Resultados anteriores con los que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Empeoramiento tolerado (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regresiones respecto a la referencia:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("Sin regresiones respecto a la referencia.")
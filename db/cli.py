@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import sys
+
+# Punto de entrada único de la ingesta. Cada subcomando importa solo lo que usa
+# (Selenium, BeautifulSoup, requests, el driver de Neo4j...) y dentro de la propia
+# función, así que las etapas pequeñas arrancan rápido y cada una se puede lanzar
+# sola, desde cron o en paralelo con las demás en otra máquina:
+#
+#   python cli.py harvest-slugs --output slugs.json
+#   python cli.py sync-plugins --slugs slugs.json --progress
+#   python cli.py sync-core
+#   python cli.py compat --mode range
+#   python cli.py export vulnerabilities.snap
+#   python cli.py rebuild --import      (reconstrucción completa con neo4j-admin)
+#   python cli.py run --resume          (todo en secuencia, como populate_db.py)
+
+# Fichero donde harvest-slugs deja los slugs para sync-plugins
+SLUGS_FILE = ".cache/slugs.json"
+
+
+def _report(command):
+    """
+    Escribe las métricas de la ejecución con el nombre del subcomando, para que
+    varias etapas lanzadas a la vez no se pisen el informe.
+    """
+    from metrics import metrics
+    from settings import METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH
+
+    def suffixed(path):
+        if not path:
+            return None
+        root, ext = os.path.splitext(path)
+        return f"{root}-{command}{ext}"
+
+    metrics.summary()
+    metrics.write_report(suffixed(METRICS_JSON_PATH), suffixed(METRICS_PROMETHEUS_PATH))
+
+
+def _save_slugs(slugs, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(sorted(slugs), fh)
+    os.replace(tmp_path, path)
+
+
+def harvest_slugs(args):
+    from wpscan_scraper import extract_plugins
+    from settings import SLUG_HARVEST_MODE
+
+    slugs = extract_plugins(mode=args.mode or SLUG_HARVEST_MODE)
+    if args.output == "-":
+        json.dump(sorted(slugs), sys.stdout)
+        print()
+    else:
+        _save_slugs(slugs, args.output)
+        print(f"Se han guardado {len(slugs)} slugs en {args.output}")
+
+
+def sync_plugins(args):
+    import populate_db
+
+    if os.path.exists(args.slugs):
+        with open(args.slugs, encoding="utf-8") as fh:
+            slugs = json.load(fh)
+    else:
+        print(f"No existe {args.slugs}: se extraen los slugs antes de sincronizar.")
+        from wpscan_scraper import extract_plugins
+        slugs = extract_plugins()
+        _save_slugs(slugs, args.slugs)
+
+    populate_db.show_progress = populate_db.show_progress or args.progress
+    populate_db.migrate()
+    populate_db.check_plugins(slugs)
+    populate_db.mark_ingest_finished()
+
+
+def sync_core(args):
+    import populate_db
+    from wpscan_api import wordpress
+
+    populate_db.show_progress = populate_db.show_progress or args.progress
+    populate_db.migrate()
+    populate_db.check_versions(wordpress.get_all_versions())
+    populate_db.mark_ingest_finished()
+
+
+def compat(args):
+    if args.migrate_edges:
+        from compat import migrate_compat_edges
+        migrate_compat_edges()
+        return
+    import populate_db
+    from settings import COMPAT_MODE
+
+    populate_db.migrate()
+    populate_db.fetch_all_plugins(mode=args.mode or COMPAT_MODE)
+
+
+def export(args):
+    from snapshot import export_snapshot
+
+    if args.previous and not os.path.exists(args.previous):
+        print(f"No existe el snapshot anterior {args.previous}.")
+        sys.exit(1)
+    export_snapshot(args.path)
+    if args.previous:
+        from snapshot import make_delta
+        make_delta(args.previous, args.path, args.delta or f"{args.path}.delta.gz")
+
+
+def rebuild(args):
+    import populate_db
+    from settings import COMPAT_MODE, STAGING_DIR
+
+    slugs = None
+    if args.slugs and os.path.exists(args.slugs):
+        with open(args.slugs, encoding="utf-8") as fh:
+            slugs = json.load(fh)
+    populate_db.show_progress = populate_db.show_progress or args.progress
+    try:
+        populate_db.rebuild(args.staging_dir or STAGING_DIR, slugs=slugs,
+                            compat_mode=args.mode or COMPAT_MODE, run_import=args.run_import,
+                            resume=args.resume)
+    except populate_db.RebuildIncomplete as error:
+        print(error)
+        sys.exit(1)
+
+
+def migrate(args):
+    from schema import migrate as migrate_schema
+    migrate_schema()
+
+
+def run(args):
+    import populate_db
+
+    populate_db.show_progress = populate_db.show_progress or args.progress
+    populate_db.run(resume=args.resume)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Ingesta de plugins, versiones y vulnerabilidades en Neo4j.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("harvest-slugs", help="Extrae de wpscan.com los slugs de plugins con vulnerabilidades")
+    p.add_argument("--output", default=SLUGS_FILE, help="Fichero JSON de salida ('-' para la salida estándar)")
+    p.add_argument("--mode", choices=["http", "selenium"], help="Modo de extracción (por defecto SLUG_HARVEST_MODE)")
+    p.set_defaults(func=harvest_slugs)
+
+    p = sub.add_parser("sync-plugins", help="Descarga de WPScan los plugins que faltan o han caducado")
+    p.add_argument("--slugs", default=SLUGS_FILE, help="Fichero de harvest-slugs; si no existe se extraen antes")
+    p.add_argument("--progress", action="store_true", help="Muestra el avance con su ritmo y el tiempo estimado")
+    p.set_defaults(func=sync_plugins)
+
+    p = sub.add_parser("sync-core", help="Descarga de WPScan las versiones de WordPress que faltan o han caducado")
+    p.add_argument("--progress", action="store_true", help="Muestra el avance con su ritmo y el tiempo estimado")
+    p.set_defaults(func=sync_core)
+
+    p = sub.add_parser("compat", help="Actualiza la compatibilidad con el catálogo de wordpress.org")
+    p.add_argument("--mode", choices=["range", "edges"], help="Modo de compatibilidad (por defecto COMPAT_MODE)")
+    p.add_argument("--migrate-edges", action="store_true", help="Convierte las aristas IS_COMPATIBLE en rangos")
+    p.set_defaults(func=compat)
+
+    p = sub.add_parser("export", help="Exporta el grafo a un snapshot offline")
+    p.add_argument("path")
+    p.add_argument("--previous", help="Snapshot anterior con el que generar un delta")
+    p.add_argument("--delta", help="Fichero del delta (por defecto <path>.delta.gz)")
+    p.set_defaults(func=export)
+
+    p = sub.add_parser("rebuild", help="Reconstruye el grafo entero con neo4j-admin import a partir de CSV")
+    p.add_argument("--staging-dir", help="Directorio de los CSV (por defecto STAGING_DIR)")
+    p.add_argument("--slugs", default=SLUGS_FILE, help="Fichero de harvest-slugs; si no existe se extraen antes")
+    p.add_argument("--mode", choices=["range", "edges"], help="Modo de compatibilidad (por defecto COMPAT_MODE)")
+    p.add_argument("--import", dest="run_import", action="store_true",
+                   help="Lanza neo4j-admin al terminar (la base de datos debe estar parada)")
+    p.add_argument("--resume", action="store_true",
+                   help="Continúa una reconstrucción interrumpida en lugar de vaciar el directorio")
+    p.add_argument("--progress", action="store_true", help="Muestra el avance con su ritmo y el tiempo estimado")
+    p.set_defaults(func=rebuild)
+
+    p = sub.add_parser("migrate", help="Aplica las migraciones de esquema pendientes")
+    p.set_defaults(func=migrate)
+
+    p = sub.add_parser("run", help="Ingesta completa en secuencia, con diario de progreso")
+    p.add_argument("--resume", action="store_true", help="Continúa la última ejecución sin terminar")
+    p.add_argument("--progress", action="store_true", help="Muestra el avance con su ritmo y el tiempo estimado")
+    p.set_defaults(func=run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        # run escribe su propio informe
+        if args.command != "run" and "metrics" in sys.modules:
+            _report(args.command)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from database import neo4j_conn
+
+# Límite superior usado cuando un plugin no declara 'tested' (compatible en adelante)
+MAX_VERSION_INT = 999999
+
+def version_to_int(version):
+    """
+    Convierte una cadena de versión en un entero usando la fórmula:
+      entero = major * 10000 + minor * 100 + patch.
+    Si algún componente no es numérico (por ejemplo, 'x'), se toma como 0.
+    Se asegura además de tener tres componentes, completando con "0" si es necesario.
+    """
+    parts = version.split('.')
+    # Aseguramos que haya 3 partes (completamos con "0" si falta)
+    while len(parts) < 3:
+        parts.append("0")
+    
+    def safe_int(x):
+        try:
+            return int(x)
+        except ValueError:
+            return 0
+
+    major = safe_int(parts[0])
+    minor = safe_int(parts[1])
+    patch = safe_int(parts[2])
+    return major * 10000 + minor * 100 + patch
+
+def extraer_rango_compatibilidad(plugin):
+    """
+    A partir de los atributos 'requires' y 'tested' del plugin,
+    devuelve una tupla (requires_full, tested_full) en formato x.y.z, completando a tres dígitos.
+    
+    La lógica es la siguiente:
+      - Si existe 'requires' pero no 'tested': se devuelve (requires_completo, None)
+      - Si existe 'tested' pero no 'requires': se devuelve ("0.0.0", tested_completo)
+      - Si no existe ninguno: se devuelve (None, None)
+    """
+    requires = plugin.get("requires")
+    tested = plugin.get("tested")
+    
+    # Normalizar requires:
+    if requires and requires.strip():
+        requires = requires.strip()
+        if requires.count('.') == 1:
+            requires_full = requires + ".0"
+        else:
+            requires_full = requires
+    else:
+        requires_full = None
+    
+    # Normalizar tested:
+    if tested and tested.strip():
+        tested = tested.strip()
+        if tested.count('.') == 1:
+            tested_full = tested + ".0"
+        else:
+            tested_full = tested
+    else:
+        tested_full = None
+    
+    return requires_full, tested_full
+
+def compat_bounds(plugin):
+    """
+    Devuelve el rango de compatibilidad (lower_int, upper_int) de un plugin de
+    wordpress.org como enteros comparables con WordPressVersion.version_int.
+    """
+    requires_full, tested_full = extraer_rango_compatibilidad(plugin)
+
+    if requires_full is None and tested_full is None:
+        # Sin información, se asume que es compatible con todas las versiones
+        return 0, MAX_VERSION_INT
+    if requires_full and tested_full:
+        return version_to_int(requires_full), version_to_int(tested_full)
+    if requires_full:
+        return version_to_int(requires_full), MAX_VERSION_INT  # Compatible desde 'requires' en adelante
+    return 0, version_to_int(tested_full)  # Asumimos compatibilidad desde "0.0.0"
+
+def backfill_version_ints():
+    """
+    Rellena WordPressVersion.version_int en los nodos que todavía no lo tienen.
+    Los índices del modo por rangos los crea schema.py.
+    """
+    versions = neo4j_conn.fetch_query("""
+    MATCH (wp:WordPressVersion)
+    WHERE wp.version_int IS NULL
+    RETURN wp.version AS version
+    """)
+    neo4j_conn.write_batches([("""
+    UNWIND $rows AS row
+    MATCH (wp:WordPressVersion {version: row.version})
+    SET wp.version_int = row.version_int
+    """, [{"version": r["version"], "version_int": version_to_int(r["version"])} for r in versions])])
+
+def migrate_compat_edges(batch_size=10000):
+    """
+    Convierte las aristas :IS_COMPATIBLE materializadas en los límites
+    requires_int / tested_int del nodo Plugin y después las elimina por lotes.
+
+    El rango de cada plugin es el mínimo y el máximo de las versiones a las que
+    apuntaban sus aristas; si coinciden con la versión más antigua o más reciente
+    de la base de datos se dejan abiertos (0 / MAX_VERSION_INT), igual que hacía
+    fetch_all_plugins cuando faltaba 'requires' o 'tested'.
+    """
+    backfill_version_ints()
+
+    bounds = neo4j_conn.fetch_query("""
+    MATCH (wp:WordPressVersion)
+    RETURN min(wp.version_int) AS lowest, max(wp.version_int) AS highest
+    """)
+    lowest = bounds[0]["lowest"] if bounds else None
+    highest = bounds[0]["highest"] if bounds else None
+
+    neo4j_conn.query("""
+    MATCH (p:Plugin)-[:IS_COMPATIBLE]->(wp:WordPressVersion)
+    WHERE p.requires_int IS NULL
+    WITH p, min(wp.version_int) AS lower_int, max(wp.version_int) AS upper_int
+    SET p.requires_int = CASE WHEN lower_int = $lowest THEN 0 ELSE lower_int END,
+        p.tested_int = CASE WHEN upper_int = $highest THEN $max_int ELSE upper_int END
+    """, {"lowest": lowest, "highest": highest, "max_int": MAX_VERSION_INT})
+
+    neo4j_conn.query(f"""
+    MATCH (:Plugin)-[r:IS_COMPATIBLE]->(:WordPressVersion)
+    CALL {{ WITH r DELETE r }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+    """)
+    print("Las aristas IS_COMPATIBLE se han convertido en rangos en los nodos Plugin.")
+
+def is_compatible(slug, version):
+    """Indica si el plugin 'slug' es compatible con la versión de WordPress 'version'."""
+    result = neo4j_conn.fetch_query("""
+    MATCH (p:Plugin {slug: $slug})
+    WHERE p.requires_int <= $version_int AND p.tested_int >= $version_int
+    RETURN p.slug AS slug
+    """, {"slug": slug, "version_int": version_to_int(version)})
+    return bool(result)
+
+def compatible_plugins(version):
+    """Devuelve los slugs de los plugins compatibles con una versión de WordPress."""
+    result = neo4j_conn.fetch_query("""
+    MATCH (p:Plugin)
+    WHERE p.requires_int <= $version_int AND p.tested_int >= $version_int
+    RETURN p.slug AS slug
+    """, {"version_int": version_to_int(version)})
+    return [r["slug"] for r in result]
+
+def compatible_versions(slug):
+    """Devuelve las versiones de WordPress guardadas con las que es compatible un plugin."""
+    result = neo4j_conn.fetch_query("""
+    MATCH (p:Plugin {slug: $slug}), (wp:WordPressVersion)
+    WHERE wp.version_int >= p.requires_int AND wp.version_int <= p.tested_int
+    RETURN wp.version AS version
+    ORDER BY wp.version_int
+    """, {"slug": slug})
+    return [r["version"] for r in result]
+
+if __name__ == "__main__":
+    migrate_compat_edges()
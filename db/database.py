@@ -1,25 +1,226 @@
-from neo4j import GraphDatabase
+import random
+import threading
+import time
+
 from settings import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from settings import NEO4J_DATABASE, NEO4J_MAX_POOL_SIZE, NEO4J_FETCH_SIZE, NEO4J_MAX_RETRY_TIME
+from metrics import metrics
+
+
+def _driver_config(max_pool_size, max_retry_time):
+    return {
+        "auth": (NEO4J_USER, NEO4J_PASSWORD),
+        "max_connection_pool_size": max_pool_size,
+        "max_transaction_retry_time": max_retry_time,
+    }
+
+
+def _is_retryable(error):
+    """Errores transitorios del clúster (líder caído, bloqueos...) que merece la pena reintentar."""
+    from neo4j.exceptions import SessionExpired, ServiceUnavailable, TransientError
+    return isinstance(error, (SessionExpired, ServiceUnavailable, TransientError))
+
+
+def _chunks(statements, batch_size):
+    for query, rows in statements:
+        for start in range(0, len(rows), batch_size):
+            yield query, rows[start:start + batch_size]
+
 
 class Neo4jConnection:
+    """
+    Conexión a Neo4j compartida por todos los hilos. El driver (y su pool de
+    conexiones) se crea la primera vez que se usa, no al importar el módulo.
+
+    Las lecturas y las escrituras van en transacciones gestionadas por el driver
+    (execute_read / execute_write), que las reintentan solas ante errores
+    transitorios durante hasta 'max_retry_time' segundos. Cada llamada abre su
+    propia sesión, así que se pueden lanzar muchas a la vez desde varios hilos.
+    """
+
+    def __init__(self, uri=NEO4J_URI, database=NEO4J_DATABASE, max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 fetch_size=NEO4J_FETCH_SIZE, max_retry_time=NEO4J_MAX_RETRY_TIME):
+        self.uri = uri
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.fetch_size = fetch_size
+        self.max_retry_time = max_retry_time
+        self._driver = None
+        self._lock = threading.Lock()
 
-    def __init__(self):
-        self._driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    from neo4j import GraphDatabase
+                    self._driver = GraphDatabase.driver(self.uri, **_driver_config(self.max_pool_size, self.max_retry_time))
+        return self._driver
+
+    def session(self):
+        return self.driver.session(database=self.database, fetch_size=self.fetch_size)
 
     def close(self):
-        self._driver.close()
+        with self._lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+
+    def read_transaction(self, work, *args, **kwargs):
+        """Ejecuta work(tx, *args, **kwargs) en una transacción de lectura con reintentos."""
+        with self.session() as session:
+            return session.execute_read(work, *args, **kwargs)
+
+    def write_transaction(self, work, *args, **kwargs):
+        """Ejecuta work(tx, *args, **kwargs) en una transacción de escritura con reintentos."""
+        with self.session() as session:
+            return session.execute_write(work, *args, **kwargs)
 
     def query(self, query, parameters=None):
-        with self._driver.session() as session:
-            return session.run(query, parameters)
-    
+        """
+        Ejecuta una sentencia en una transacción implícita y devuelve su resumen
+        (ResultSummary), ya consumido dentro de la sesión. Es lo que necesitan las
+        sentencias de esquema y CALL {...} IN TRANSACTIONS, que no pueden ir en una
+        transacción gestionada; los errores transitorios se reintentan con backoff
+        hasta 'max_retry_time', así que la sentencia debe ser idempotente (MERGE/SET).
+        """
+        deadline = time.monotonic() + self.max_retry_time
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer("neo4j.query"), self.session() as session:
+                    return session.run(query, parameters).consume()
+            except Exception as e:
+                if not _is_retryable(e) or time.monotonic() >= deadline:
+                    raise
+                metrics.count("neo4j.query", "retries")
+                time.sleep(random.uniform(0, min(5.0, 0.2 * 2 ** attempt)))
+                attempt += 1
+
     def fetch_query(self, query, parameters=None):
         """
-        Ejecuta una consulta y devuelve los resultados como una lista de diccionarios,
-        asegurando que los resultados no estén consumidos.
+        Ejecuta una consulta de lectura y devuelve los resultados como una lista de
+        diccionarios, leídos por completo dentro de la transacción.
+        """
+        def work(tx):
+            return [record.data() for record in tx.run(query, parameters)]
+
+        with metrics.timer("neo4j.fetch_query"):
+            rows = self.read_transaction(work)
+        metrics.count("neo4j.fetch_query", "rows", len(rows))
+        return rows
+
+    def write_batches(self, statements, batch_size=500):
+        """
+        Ejecuta varias sentencias UNWIND dentro de una única transacción de escritura.
+        Cada elemento de 'statements' es una tupla (query, rows); las filas se envían
+        en trozos de 'batch_size' como parámetro $rows, de modo que un payload completo
+        cuesta un solo round-trip por trozo en lugar de uno por fila.
         """
-        with self._driver.session() as session:
-            result = session.run(query, parameters)
-            return [record.data() for record in result]
+        statements = [(query, rows) for query, rows in statements if rows]
+        if not statements:
+            return
+
+        def work(tx):
+            for query, chunk in _chunks(statements, batch_size):
+                tx.run(query, {"rows": chunk}).consume()
+
+        with metrics.timer("neo4j.write_batches"):
+            self.write_transaction(work)
+        metrics.count("neo4j.write_batches", "rows", sum(len(rows) for _, rows in statements))
+
+
+class AsyncNeo4jConnection:
+    """
+    Variante asyncio de Neo4jConnection sobre el driver asíncrono, con la misma
+    interfaz en forma de corrutinas. Hay que crearla y usarla dentro del mismo bucle
+    de eventos; las corrutinas se pueden lanzar en paralelo con asyncio.gather y
+    comparten el pool de conexiones.
+
+        async with AsyncNeo4jConnection() as conn:
+            rows = await conn.fetch_query("MATCH (p:Plugin) RETURN count(p) AS n")
+    """
+
+    def __init__(self, uri=NEO4J_URI, database=NEO4J_DATABASE, max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 fetch_size=NEO4J_FETCH_SIZE, max_retry_time=NEO4J_MAX_RETRY_TIME):
+        self.uri = uri
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.fetch_size = fetch_size
+        self.max_retry_time = max_retry_time
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            from neo4j import AsyncGraphDatabase
+            self._driver = AsyncGraphDatabase.driver(self.uri, **_driver_config(self.max_pool_size, self.max_retry_time))
+        return self._driver
+
+    def session(self):
+        return self.driver.session(database=self.database, fetch_size=self.fetch_size)
+
+    async def close(self):
+        if self._driver is not None:
+            await self._driver.close()
+            self._driver = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def read_transaction(self, work, *args, **kwargs):
+        async with self.session() as session:
+            return await session.execute_read(work, *args, **kwargs)
+
+    async def write_transaction(self, work, *args, **kwargs):
+        async with self.session() as session:
+            return await session.execute_write(work, *args, **kwargs)
+
+    async def query(self, query, parameters=None):
+        """Igual que Neo4jConnection.query: transacción implícita y reintentos con backoff."""
+        import asyncio
+        deadline = time.monotonic() + self.max_retry_time
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer("neo4j.query"):
+                    async with self.session() as session:
+                        result = await session.run(query, parameters)
+                        return await result.consume()
+            except Exception as e:
+                if not _is_retryable(e) or time.monotonic() >= deadline:
+                    raise
+                metrics.count("neo4j.query", "retries")
+                await asyncio.sleep(random.uniform(0, min(5.0, 0.2 * 2 ** attempt)))
+                attempt += 1
+
+    async def fetch_query(self, query, parameters=None):
+        async def work(tx):
+            result = await tx.run(query, parameters)
+            return [record.data() async for record in result]
+
+        with metrics.timer("neo4j.fetch_query"):
+            rows = await self.read_transaction(work)
+        metrics.count("neo4j.fetch_query", "rows", len(rows))
+        return rows
+
+    async def write_batches(self, statements, batch_size=500):
+        statements = [(query, rows) for query, rows in statements if rows]
+        if not statements:
+            return
+
+        async def work(tx):
+            for query, chunk in _chunks(statements, batch_size):
+                result = await tx.run(query, {"rows": chunk})
+                await result.consume()
+
+        with metrics.timer("neo4j.write_batches"):
+            await self.write_transaction(work)
+        metrics.count("neo4j.write_batches", "rows", sum(len(rows) for _, rows in statements))
+
 
-neo4j_conn = Neo4jConnection()
\ No newline at end of file
+# Conexión compartida; no abre nada hasta la primera consulta
+neo4j_conn = Neo4jConnection()
@@ -0,0 +1,64 @@
+from database import neo4j_conn
+
+# Metadatos del catálogo de wordpress.org que se guardan en el nodo Plugin:
+# propiedad del nodo -> campo de PluginRecord
+ENRICH_FIELDS = {
+    "name": "name",
+    "version": "version",
+    "author": "author",
+    "last_updated_wp": "last_updated",
+    "rating": "rating",
+    "num_ratings": "num_ratings",
+    "homepage": "homepage",
+    "short_description": "short_description",
+}
+
+# Mismo criterio que UNWIND_PLUGINS: un campo vacío no borra el valor guardado
+UNWIND_ENRICH = """
+UNWIND $rows AS row
+MATCH (p:Plugin {slug: row.slug})
+SET """ + ",\n    ".join(f"p.{prop} = COALESCE(row.{prop}, p.{prop})" for prop in ENRICH_FIELDS) + "\n"
+
+
+def load_catalogue_dates():
+    """slug -> last_updated_wp de todos los plugins guardados, con una sola consulta."""
+    rows = neo4j_conn.fetch_query("MATCH (p:Plugin) RETURN p.slug AS slug, p.last_updated_wp AS last_updated_wp")
+    return {r["slug"]: r["last_updated_wp"] for r in rows}
+
+
+class CatalogueEnricher:
+    """
+    Decide qué registros del catálogo de wordpress.org hay que volcar en los nodos
+    Plugin. 'known' es slug -> last_updated_wp de lo ya guardado (load_catalogue_dates):
+    los slugs que no están en el grafo se cuentan como desconocidos y los que tienen
+    la misma fecha de actualización que la guardada se omiten. Con known=None (por
+    ejemplo, al preparar una reconstrucción completa) se devuelven todos.
+    """
+
+    def __init__(self, known=None):
+        self.known = known
+        self.counts = {"matched": 0, "updated": 0, "unchanged": 0, "unknown": 0}
+
+    def row(self, record):
+        """Fila para UNWIND_ENRICH, o None si no hay nada que escribir."""
+        if self.known is not None:
+            if record.slug not in self.known:
+                self.counts["unknown"] += 1
+                return None
+            self.counts["matched"] += 1
+            if record.last_updated is not None and self.known[record.slug] == record.last_updated:
+                self.counts["unchanged"] += 1
+                return None
+        self.counts["updated"] += 1
+        row = {"slug": record.slug}
+        row.update({prop: record.get(field) for prop, field in ENRICH_FIELDS.items()})
+        return row
+
+    def report(self):
+        c = self.counts
+        if self.known is None:
+            print(f"Metadatos del catálogo: {c['updated']} plugins preparados.")
+        else:
+            print(f"Metadatos del catálogo: {c['matched']} plugins encontrados en el grafo, {c['updated']} actualizados, "
+                  f"{c['unchanged']} sin cambios y {c['unknown']} que no están en el grafo.")
+        return dict(c)
@@ -0,0 +1,251 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Servidor local que imita las partes de WPScan, api.wordpress.org, wordpress.org y
+# wpscan.com que usa la ingesta, para medirla sin gastar cuota. Sirve respuestas
+# grabadas de un directorio de fixtures cuando existen y sintéticas en otro caso:
+#
+#   fixtures/plugins/<slug>.json          respuesta de /plugins/<slug>
+#   fixtures/wordpresses/<versión>.json   respuesta de /wordpresses/<versión>
+#   fixtures/query_plugins/<página>.json  página del catálogo de wordpress.org
+#   fixtures/releases.html                página de versiones de WordPress
+#   fixtures/listing/<filtro>-<página>.html  listado de plugins de wpscan.com
+
+SEVERITIES = [("low", 3.1), ("medium", 5.4), ("high", 7.5), ("critical", 9.8)]
+VULN_TYPES = ["XSS", "SQLI", "CSRF", "RCE", "AUTHBYPASS", "LFI"]
+
+
+class SyntheticCorpus:
+    """Genera datos deterministas con el tamaño indicado por los parámetros de escala."""
+
+    def __init__(self, plugins=1000, vulns_per_plugin=5, versions=100, core_vulns=50, per_page=250,
+                 listing_per_page=50, seed=0):
+        # La primera letra varía para repartir los slugs entre los filtros del listado
+        self.slugs = [f"{'0abcdefghijklmnopqrstuvwxyz'[i % 27]}-plugin-{i:06d}" for i in range(plugins)]
+        self.vulns_per_plugin = vulns_per_plugin
+        self.versions = [f"{5 + i // 100}.{(i // 10) % 10}.{i % 10}" for i in range(versions)]
+        self.core_vulns = core_vulns
+        self.per_page = per_page
+        self.listing_per_page = listing_per_page
+        self.seed = seed
+
+    def _vulnerability(self, prefix, n, rng):
+        severity, score = rng.choice(SEVERITIES)
+        fixed = f"{rng.randint(1, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}"
+        return {
+            "id": f"{prefix}-{n}",
+            "title": f"Synthetic vulnerability {prefix}-{n}",
+            "created_at": "2024-01-01T00:00:00.000Z",
+            "updated_at": "2024-02-01T00:00:00.000Z",
+            "published_date": "2024-01-01T00:00:00.000Z",
+            "description": None,
+            "vuln_type": rng.choice(VULN_TYPES),
+            "references": {"url": [f"https://example.com/{prefix}-{n}"], "cve": [f"2024-{n:05d}"]},
+            "cvss": {"score": score, "vector": "CVSS:3.1/AV:N", "severity": severity},
+            "verified": False,
+            "fixed_in": None if rng.random() < 0.1 else fixed,
+            "introduced_in": None,
+        }
+
+    def plugin(self, slug):
+        if slug not in set(self.slugs):
+            return None
+        rng = random.Random(f"{self.seed}-{slug}")
+        return {slug: {
+            "friendly_name": slug,
+            "latest_version": f"{rng.randint(1, 9)}.{rng.randint(0, 20)}",
+            "last_updated": "2024-03-01T00:00:00.000Z",
+            "popular": rng.random() < 0.2,
+            "vulnerabilities": [self._vulnerability(slug, n, rng) for n in range(self.vulns_per_plugin)],
+        }}
+
+    def wordpress(self, version):
+        if version not in self.versions:
+            return None
+        rng = random.Random(f"{self.seed}-core")
+        # Como en WPScan, cada vulnerabilidad del núcleo se repite en muchas versiones
+        shared = [self._vulnerability("core", n, rng) for n in range(self.core_vulns)]
+        position = self.versions.index(version)
+        return {version: {
+            "release_date": "2024-01-01",
+            "changelog_url": f"https://wordpress.org/documentation/wordpress-version/version-{version}/",
+            "status": "latest" if position == len(self.versions) - 1 else "insecure",
+            "vulnerabilities": shared[position % max(len(shared), 1):] if shared else [],
+        }}
+
+    def catalogue_page(self, page):
+        pages = max(1, -(-len(self.slugs) // self.per_page))
+        chunk = self.slugs[(page - 1) * self.per_page:page * self.per_page]
+        rng = random.Random(f"{self.seed}-page-{page}")
+        return {"info": {"page": page, "pages": pages, "results": len(self.slugs)}, "plugins": [{
+            "slug": slug, "name": slug, "version": "1.0", "requires": "5.0", "tested": "6.4",
+            "last_updated": "2024-03-01 10:00am GMT", "active_installs": rng.choice([0, 100, 10000, 1000000]),
+            "downloaded": rng.randint(0, 10 ** 7), "author": f'<a href="https://example.com/">Author of {slug}</a>',
+            "rating": rng.randint(0, 100), "num_ratings": rng.randint(0, 500),
+            "homepage": f"https://example.com/{slug}/", "short_description": f"Synthetic plugin {slug}.",
+        } for slug in chunk]}
+
+    def releases_html(self):
+        rows = "".join(
+            f'<tr><th class="wp-block-wporg-release-tables__cell-version">{v}</th></tr>' for v in self.versions)
+        return ('<div class="wp-block-wporg-release-tables__section"><table><tbody>'
+                f'{rows}</tbody></table></div>')
+
+    def listing_html(self, filtro, page):
+        if filtro == "0-9":
+            slugs = [s for s in self.slugs if not s[0].isalpha()]
+        else:
+            slugs = [s for s in self.slugs if s.startswith(filtro)]
+        pages = max(1, -(-len(slugs) // self.listing_per_page))
+        chunk = slugs[(page - 1) * self.listing_per_page:page * self.listing_per_page]
+        rows = "".join(f'<div class="vulnerabilities__table--row"><div class="vulnerabilities__table--slug">'
+                       f'<a>{slug}</a></div></div>' for slug in chunk)
+        pagination = "".join(f"<li><a>{n}</a></li>" for n in range(1, pages + 1))
+        return (f'<div class="vulnerabilities__table--body">{rows}</div>'
+                f'<ul class="vulnerabilities__pagination">{pagination}</ul>')
+
+
+class FakeServices:
+    """
+    Servidor HTTP local con latencia y tasa de errores configurables. Cuenta las
+    peticiones por ruta para que el benchmark pueda informar de ellas.
+
+    Con 'quota', la API de WPScan se comporta como un plan con esa cuota diaria:
+    /status informa de lo que queda y, al agotarse, responde 429.
+    """
+
+    def __init__(self, corpus, fixtures_dir=None, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0, quota=None):
+        self.corpus = corpus
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota = quota
+        self.quota_used = 0
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _fixture(self, *parts):
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, *parts)
+        if os.path.exists(path):
+            with open(path, "rb") as fh:
+                return fh.read()
+        return None
+
+    def _route(self, path, query):
+        """Devuelve (estado, content-type, cuerpo) para una petición."""
+        parts = [p for p in path.split("/") if p]
+        if "api" in parts:
+            if parts[-1:] == ["status"]:
+                remaining = -1 if self.quota is None else max(self.quota - self.quota_used, 0)
+                return 200, "application/json", json.dumps({"plan": "fake", "requests_remaining": remaining}).encode()
+            with self._lock:
+                self.quota_used += 1
+                exhausted = self.quota is not None and self.quota_used > self.quota
+            if exhausted:
+                return 429, "application/json", b'{"status": "rate limit hit"}'
+        if parts[-2:-1] == ["plugins"] and "api" in parts:
+            slug = parts[-1]
+            body = self._fixture("plugins", f"{slug}.json")
+            data = None if body else self.corpus.plugin(slug)
+        elif parts[-2:-1] == ["wordpresses"]:
+            version = parts[-1]
+            body = self._fixture("wordpresses", f"{version}.json")
+            data = None if body else self.corpus.wordpress(version)
+        elif query.get("action") == ["query_plugins"]:
+            page = int(query.get("request[page]", ["1"])[0])
+            body = self._fixture("query_plugins", f"{page}.json")
+            data = None if body else self.corpus.catalogue_page(page)
+        elif parts[-2:] == ["download", "releases"]:
+            return 200, "text/html", self._fixture("releases.html") or self.corpus.releases_html().encode()
+        elif parts[-1:] == ["plugins"]:
+            page = int(query.get("page", ["1"])[0])
+            filtro = (query.get("get", [""])[0]) or "0-9"
+            html = self._fixture("listing", f"{filtro}-{page}.html")
+            return 200, "text/html", html or self.corpus.listing_html(filtro, page).encode()
+        else:
+            return 404, "application/json", b'{"error": "not found"}'
+
+        if body:
+            return 200, "application/json", body
+        if data is None:
+            return 404, "application/json", b'{"error": "not found"}'
+        return 200, "application/json", json.dumps(data).encode()
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with services._lock:
+                    services.requests[parsed.path] = services.requests.get(parsed.path, 0) + 1
+                if services.latency:
+                    time.sleep(services.latency)
+                if services.error_rate and random.random() < services.error_rate:
+                    status, content_type, body = 503, "application/json", b'{"error": "unavailable"}'
+                else:
+                    status, content_type, body = services._route(parsed.path, parse_qs(parsed.query, keep_blank_values=True))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def record_corpus(out_dir, slugs=(), versions=(), pages=1):
+    """
+    Graba respuestas reales de WPScan y wordpress.org en 'out_dir' con la estructura
+    que sirve FakeServices. Gasta una petición de cuota por slug y por versión.
+    """
+    from wpscan_api import wpscan, wordpress
+
+    def write(data, *parts):
+        path = os.path.join(out_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = "wb" if isinstance(data, bytes) else "w"
+        with open(path, mode) as fh:
+            fh.write(data)
+
+    for slug in slugs:
+        data = wpscan.get_plugin(slug)
+        if data:
+            write(json.dumps(data), "plugins", f"{slug}.json")
+    for version in versions:
+        data = wpscan.get_wordpress_version(version)
+        if data:
+            write(json.dumps(data), "wordpresses", f"{version}.json")
+    for page in range(1, pages + 1):
+        data = wordpress._get_plugins_page(page)
+        if data:
+            write(json.dumps(data), "query_plugins", f"{page}.json")
+    response = wordpress.client.get(wordpress.releases_url)
+    write(response.content, "releases.html")
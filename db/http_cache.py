@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+
+class HttpCache:
+    """
+    Caché persistente de respuestas HTTP en un fichero SQLite.
+
+    Cada entrada se identifica por la URL y sus parámetros y guarda el cuerpo
+    comprimido junto con ETag/Last-Modified para poder revalidar con peticiones
+    condicionales. Cuando el tamaño total supera 'max_bytes' se eliminan las
+    entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0, "bytes_saved": 0}
+
+    @property
+    def _conn(self):
+        """Conexión a SQLite; el fichero se crea con el primer uso, no al importar."""
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def make_key(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Devuelve la entrada guardada como diccionario (body, etag, last_modified,
+        stored_at) o None si no existe.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        body, etag, last_modified, stored_at = row
+        return {"body": zlib.decompress(body), "etag": etag, "last_modified": last_modified, "stored_at": stored_at}
+
+    def put(self, key, url, body, etag=None, last_modified=None):
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, compressed, len(compressed), etag, last_modified, now, now),
+            )
+            self._conn.commit()
+            self.stats["stored"] += 1
+            self._evict()
+
+    def touch(self, key):
+        """Marca una entrada como recién validada (respuesta 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evicted"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.commit()
+
+    def record(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def report(self):
+        s = self.stats
+        print(f"Caché HTTP: {s['hits']} aciertos, {s['revalidated']} revalidadas (304), {s['misses']} fallos, "
+              f"{s['stored']} guardadas, {s['evicted']} expulsadas, {s['bytes_saved'] / 1024 / 1024:.1f} MB ahorrados.")
+        return dict(s)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
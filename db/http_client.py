@@ -0,0 +1,255 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from http_cache import HttpCache
+from metrics import metrics
+
+# Códigos de respuesta que merece la pena reintentar
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Cabeceras en las que los servidores suelen anunciar la cuota restante
+QUOTA_HEADERS = ("x-ratelimit-remaining", "x-requests-remaining")
+
+
+class QuotaExhausted(Exception):
+    """Se ha agotado la cuota diaria de peticiones del servicio."""
+
+
+class TokenBucket:
+    """
+    Limitador de tipo token bucket: se recargan 'rate' tokens por segundo hasta un
+    máximo de 'capacity'. Cada petición consume un token y espera si no hay ninguno.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate or 1))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def pause(self, seconds):
+        """Vacía el bucket para que nadie envíe peticiones durante 'seconds' segundos."""
+        with self._lock:
+            self._tokens = -seconds * (self.rate or 0)
+            self._updated = time.monotonic()
+
+
+class HttpClient:
+    """
+    Cliente HTTP con un pool de conexiones keep-alive compartido entre varios hilos,
+    limitación de ritmo, reintentos con backoff exponencial con jitter ante 429/5xx
+    y control de la cuota diaria (a partir de las cabeceras de la respuesta o de un
+    contador local si el servidor no la anuncia).
+
+    Si el servidor responde con 'quota_status' (429 en WPScan, que solo limita por
+    cuota diaria) no se reintenta: se da la cuota por agotada y se lanza QuotaExhausted.
+
+    Crear el cliente es barato: requests y la sesión con su pool de conexiones se
+    cargan con la primera petición, igual que el driver de Neo4j.
+    """
+
+    def __init__(self, workers=8, rate=None, burst=None, daily_quota=None, headers=None,
+                 timeout=30, max_retries=5, backoff=1.0, max_backoff=60.0, cache=None, name="http",
+                 quota_status=None):
+        self.workers = workers
+        # Nombre con el que se anotan las métricas de este cliente ("http.<name>")
+        self.name = name
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(rate, burst)
+        self.quota_remaining = daily_quota
+        self.quota_status = quota_status
+        self._quota_lock = threading.Lock()
+        self.headers = headers
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    if self.headers:
+                        session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def _take_quota(self):
+        with self._quota_lock:
+            if self.quota_remaining is None:
+                return
+            if self.quota_remaining <= 0:
+                raise QuotaExhausted("Se ha agotado la cuota diaria de peticiones.")
+            self.quota_remaining -= 1
+
+    def set_quota(self, remaining):
+        """Fija las peticiones que quedan (None = sin límite), por ejemplo según el servidor."""
+        with self._quota_lock:
+            self.quota_remaining = remaining
+
+    def _update_quota(self, response):
+        for header in QUOTA_HEADERS:
+            value = response.headers.get(header)
+            if value is not None and value.isdigit():
+                with self._quota_lock:
+                    self.quota_remaining = int(value)
+                return
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, url, params=None, headers=None, ttl=None, quota=True):
+        """
+        Realiza un GET respetando el limitador y la cuota. Reintenta los errores de red
+        y las respuestas 429/5xx; devuelve la última respuesta obtenida. Con quota=False
+        la petición no descuenta del contador local (consultas de estado gratuitas).
+
+        Si el cliente tiene caché y se indica 'ttl' (segundos), una respuesta guardada
+        hace menos de 'ttl' se devuelve sin tocar la red ni gastar cuota; si ha caducado
+        se revalida con If-None-Match / If-Modified-Since cuando es posible.
+        """
+        if self.cache is None or ttl is None:
+            return self._fetch(url, params, headers, quota)
+
+        key = HttpCache.make_key(url, params)
+        entry = self.cache.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < ttl:
+            self.cache.record("hits")
+            self.cache.record("bytes_saved", len(entry["body"]))
+            metrics.count(f"http.{self.name}", "cache_hits")
+            return self._cached_response(url, entry)
+
+        conditional = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                conditional["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._fetch(url, params, conditional or None, quota)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            self.cache.record("revalidated")
+            self.cache.record("bytes_saved", len(entry["body"]))
+            metrics.count(f"http.{self.name}", "revalidated")
+            return self._cached_response(url, entry)
+
+        self.cache.record("misses")
+        if response.status_code == 200:
+            self.cache.put(key, url, response.content,
+                           etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"))
+        return response
+
+    @staticmethod
+    def _cached_response(url, entry):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry["body"]
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"X-Cache": "HIT"})
+        return response
+
+    def _fetch(self, url, params=None, headers=None, quota=True):
+        import requests
+
+        attempt = 0
+        while True:
+            if quota:
+                self._take_quota()
+            self.bucket.acquire()
+            try:
+                with metrics.timer(f"http.{self.name}") as span:
+                    response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                    span["bytes"] = len(response.content)
+                    if response.status_code >= 400:
+                        span["error"] = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._delay(attempt)
+                print(f"Error de red en {url} ({e}). Reintentando en {delay:.1f}s...")
+            else:
+                self._update_quota(response)
+                if response.status_code == self.quota_status:
+                    self.set_quota(0)
+                    metrics.count(f"http.{self.name}", "quota_exhausted")
+                    raise QuotaExhausted(f"El servidor indica que se ha agotado la cuota diaria ({url}).")
+                if response.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                    return response
+                delay = self._delay(attempt, response)
+                if response.status_code == 429:
+                    self.bucket.pause(delay)
+                print(f"Error {response.status_code} en {url}. Reintentando en {delay:.1f}s...")
+            metrics.count(f"http.{self.name}", "retries")
+            time.sleep(delay)
+            attempt += 1
+
+    def map(self, func, items):
+        """
+        Aplica 'func' a cada elemento de 'items' con 'workers' hilos y va devolviendo
+        tuplas (item, resultado) según terminan. Nunca hay más de 2 * workers tareas
+        pendientes, así que 'items' puede ser un generador arbitrariamente largo.
+        Si una tarea lanza QuotaExhausted se deja de encolar trabajo y se propaga.
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+
+            def submit_next():
+                for item in items:
+                    pending[executor.submit(func, item)] = item
+                    return True
+                return False
+
+            for _ in range(self.workers * 2):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except QuotaExhausted:
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    yield item, result
+                    submit_next()
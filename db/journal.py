@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+
+from sync import now_iso
+
+
+class Journal:
+    """
+    Diario de progreso de populate_db en SQLite. Solo se añaden filas (eventos),
+    nunca se modifican, así que un corte a mitad de ejecución no deja el diario en
+    un estado inconsistente: lo último que se confirmó sigue ahí.
+
+    Guarda las ejecuciones, las etapas terminadas de cada una, las entradas de
+    cada etapa (la lista de slugs extraída, por ejemplo) y un evento por plugin o
+    versión procesado, omitido (no existe en WPScan) o fallido.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS run_events (
+                run_id INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stages (
+                run_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                finished_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS inputs (
+                run_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                run_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_run_kind ON items (run_id, kind, key);
+        """)
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def start_run(self):
+        """Abre una ejecución nueva."""
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (now_iso(),))
+            self._conn.commit()
+        print(f"Iniciando la ejecución {cursor.lastrowid} del diario.")
+        return JournalRun(self, cursor.lastrowid)
+
+    def resume_run(self):
+        """
+        Devuelve la última ejecución sin terminar para continuarla, o abre una nueva
+        si la anterior acabó correctamente.
+        """
+        rows = self._fetch("""
+            SELECT run_id FROM runs
+            WHERE run_id NOT IN (SELECT run_id FROM run_events WHERE event = 'finished')
+            ORDER BY run_id DESC LIMIT 1
+        """)
+        if not rows:
+            return self.start_run()
+        print(f"Reanudando la ejecución {rows[0][0]} del diario.")
+        return JournalRun(self, rows[0][0])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JournalRun:
+    """Vista del diario limitada a una ejecución."""
+
+    def __init__(self, journal, run_id):
+        self.journal = journal
+        self.run_id = run_id
+
+    def stage_done(self, stage):
+        return bool(self.journal._fetch(
+            "SELECT 1 FROM stages WHERE run_id = ? AND stage = ? LIMIT 1", (self.run_id, stage)))
+
+    def finish_stage(self, stage):
+        self.journal._execute("INSERT INTO stages VALUES (?, ?, ?)", (self.run_id, stage, now_iso()))
+
+    def save_input(self, name, value):
+        self.journal._execute("INSERT INTO inputs VALUES (?, ?, ?)", (self.run_id, name, json.dumps(value)))
+
+    def load_input(self, name):
+        rows = self.journal._fetch(
+            "SELECT payload FROM inputs WHERE run_id = ? AND name = ? ORDER BY rowid DESC LIMIT 1", (self.run_id, name))
+        return json.loads(rows[0][0]) if rows else None
+
+    def record_done(self, kind, keys):
+        now = now_iso()
+        with self.journal._lock:
+            self.journal._conn.executemany(
+                "INSERT INTO items VALUES (?, ?, ?, 'done', NULL, ?)",
+                [(self.run_id, kind, str(key), now) for key in keys])
+            self.journal._conn.commit()
+
+    def record_skipped(self, kind, key, reason):
+        self.journal._execute("INSERT INTO items VALUES (?, ?, ?, 'skipped', ?, ?)",
+                              (self.run_id, kind, str(key), str(reason), now_iso()))
+
+    def record_failure(self, kind, key, error):
+        self.journal._execute("INSERT INTO items VALUES (?, ?, ?, 'failed', ?, ?)",
+                              (self.run_id, kind, str(key), str(error), now_iso()))
+
+    def completed(self, kind):
+        """Claves de 'kind' ya procesadas correctamente en esta ejecución."""
+        rows = self.journal._fetch(
+            "SELECT DISTINCT key FROM items WHERE run_id = ? AND kind = ? AND status = 'done'", (self.run_id, kind))
+        return {r[0] for r in rows}
+
+    def skipped(self, kind):
+        """Claves de 'kind' omitidas en esta ejecución porque no existen en el origen."""
+        rows = self.journal._fetch(
+            "SELECT DISTINCT key FROM items WHERE run_id = ? AND kind = ? AND status = 'skipped'", (self.run_id, kind))
+        return {r[0] for r in rows}
+
+    def failures(self, kind):
+        """Claves de 'kind' que han fallado y no se han completado después: clave -> intentos."""
+        rows = self.journal._fetch("""
+            SELECT key, COUNT(*) FROM items
+            WHERE run_id = ? AND kind = ? AND status = 'failed'
+              AND key NOT IN (SELECT key FROM items WHERE run_id = ? AND kind = ? AND status = 'done')
+            GROUP BY key
+        """, (self.run_id, kind, self.run_id, kind))
+        return {r[0]: r[1] for r in rows}
+
+    def pending(self, kind, keys, max_attempts):
+        """
+        Filtra 'keys' quitando lo ya completado u omitido en esta ejecución y lo que
+        ha fallado 'max_attempts' veces o más.
+        """
+        completed = self.completed(kind) | self.skipped(kind)
+        failures = self.failures(kind)
+        exhausted = {key for key, attempts in failures.items() if attempts >= max_attempts}
+        if completed or exhausted:
+            print(f"Diario: se omiten {len(completed)} {kind} ya completados o inexistentes y {len(exhausted)} "
+                  f"que han fallado {max_attempts} veces; se reintentan {len(failures) - len(exhausted)}.")
+        return [key for key in keys if str(key) not in completed and str(key) not in exhausted]
+
+    def finish(self):
+        self.journal._execute("INSERT INTO run_events VALUES (?, 'finished', ?)", (self.run_id, now_iso()))
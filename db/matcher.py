@@ -0,0 +1,68 @@
+from database import neo4j_conn
+from versions import version_key
+
+AFFECTED_QUERY = """
+MATCH (p:Plugin {slug: $slug})-[:HAS_VULNERABILITY]->(v:Vulnerability)
+WHERE (v.fixed_in_key IS NULL OR v.fixed_in_key > $key)
+  AND (v.introduced_in_key IS NULL OR v.introduced_in_key <= $key)
+RETURN v.id AS id, v.title AS title, v.vuln_type AS vuln_type, v.score AS score,
+       v.severity AS severity, v.introduced_in AS introduced_in, v.fixed_in AS fixed_in
+"""
+
+AFFECTED_MANY_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Plugin {slug: row.slug})-[:HAS_VULNERABILITY]->(v:Vulnerability)
+WHERE (v.fixed_in_key IS NULL OR v.fixed_in_key > row.key)
+  AND (v.introduced_in_key IS NULL OR v.introduced_in_key <= row.key)
+RETURN row.slug AS slug, row.version AS version, collect(v.id) AS ids
+"""
+
+def backfill_version_keys():
+    """
+    Calcula las claves ordenables de las vulnerabilidades guardadas antes de que
+    existieran. Los índices sobre ellas los crea schema.py.
+    """
+    pending = neo4j_conn.fetch_query("""
+    MATCH (v:Vulnerability)
+    WHERE (v.fixed_in IS NOT NULL AND v.fixed_in_key IS NULL)
+       OR (v.introduced_in IS NOT NULL AND v.introduced_in_key IS NULL)
+    RETURN v.id AS id, v.fixed_in AS fixed_in, v.introduced_in AS introduced_in
+    """)
+    neo4j_conn.write_batches([("""
+    UNWIND $rows AS row
+    MATCH (v:Vulnerability {id: row.id})
+    SET v.fixed_in_key = row.fixed_in_key,
+        v.introduced_in_key = row.introduced_in_key
+    """, [{
+        "id": r["id"],
+        "fixed_in_key": version_key(r["fixed_in"]),
+        "introduced_in_key": version_key(r["introduced_in"]),
+    } for r in pending])])
+
+def affected_vulnerabilities(slug, version):
+    """
+    Devuelve las vulnerabilidades del plugin 'slug' que afectan a 'version': las
+    introducidas en o antes de 'version' y no corregidas hasta después de ella.
+    """
+    key = version_key(version)
+    if key is None:
+        print(f"No se puede interpretar la versión '{version}' del plugin '{slug}'.")
+        return []
+    return neo4j_conn.fetch_query(AFFECTED_QUERY, {"slug": slug, "key": key})
+
+def is_affected(slug, version):
+    """Indica si slug@version tiene alguna vulnerabilidad sin corregir."""
+    return bool(affected_vulnerabilities(slug, version))
+
+def affected_many(installed):
+    """
+    Resuelve en una sola consulta una lista de pares (slug, versión) y devuelve un
+    diccionario (slug, versión) -> lista de ids de vulnerabilidades que les afectan.
+    """
+    rows = []
+    for slug, version in installed:
+        key = version_key(version)
+        if key is not None:
+            rows.append({"slug": slug, "version": version, "key": key})
+    result = neo4j_conn.fetch_query(AFFECTED_MANY_QUERY, {"rows": rows})
+    return {(r["slug"], r["version"]): r["ids"] for r in result}
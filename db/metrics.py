@@ -0,0 +1,281 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Límites (en segundos) de los cubos del histograma de latencias
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prefijo de las métricas en el fichero para el textfile collector de Prometheus
+PROMETHEUS_PREFIX = "populate_db"
+
+
+class Histogram:
+    """Histograma de latencias con cubos fijos, acumulable como los de Prometheus."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, limit in enumerate(self.buckets):
+            if seconds <= limit:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimación del cuantil 'q' a partir de los cubos (el límite superior del cubo)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+
+class Metrics:
+    """
+    Registro de métricas de una ejecución, compartido por todos los hilos.
+
+    Cada operación ("wpscan.get_plugin", "http.wpscan", "neo4j.write_batches"...)
+    acumula un histograma de latencias, el número de llamadas, los bytes
+    transferidos, los errores por código (estado HTTP o tipo de excepción) y
+    contadores libres como los reintentos o los aciertos de caché.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.operations = {}
+
+    def _operation(self, operation):
+        op = self.operations.get(operation)
+        if op is None:
+            op = self.operations[operation] = {
+                "latency": Histogram(self.buckets), "bytes": 0, "errors": {}, "counters": {}}
+        return op
+
+    def observe(self, operation, seconds, nbytes=0, error=None):
+        with self._lock:
+            op = self._operation(operation)
+            op["latency"].observe(seconds)
+            op["bytes"] += nbytes or 0
+            if error is not None:
+                op["errors"][str(error)] = op["errors"].get(str(error), 0) + 1
+
+    def count(self, operation, name, amount=1):
+        with self._lock:
+            counters = self._operation(operation)["counters"]
+            counters[name] = counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, operation):
+        """
+        Mide el bloque y lo anota en 'operation'. El bloque puede rellenar
+        span["bytes"] y span["error"]; una excepción se anota con su tipo.
+        """
+        span = {"bytes": 0, "error": None}
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = type(e).__name__
+            raise
+        finally:
+            self.observe(operation, time.perf_counter() - started, span["bytes"], span["error"])
+
+    def instrument(self, operation):
+        """Decorador que mide cada llamada a la función con timer()."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(operation):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Estado actual como diccionario serializable."""
+        with self._lock:
+            operations = {}
+            for name, op in sorted(self.operations.items()):
+                latency = op["latency"]
+                operations[name] = {
+                    "count": latency.count,
+                    "seconds_total": round(latency.total, 3),
+                    "seconds_avg": round(latency.total / latency.count, 4) if latency.count else None,
+                    "seconds_p50": latency.quantile(0.5),
+                    "seconds_p95": latency.quantile(0.95),
+                    "seconds_max": round(latency.max, 3),
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], latency.counts)),
+                    "bytes": op["bytes"],
+                    "errors": dict(op["errors"]),
+                    "counters": dict(op["counters"]),
+                }
+            return {"started": self.started, "duration_seconds": round(time.time() - self.started, 3),
+                    "operations": operations}
+
+    def to_prometheus(self):
+        """Texto en el formato de exposición de Prometheus (para el textfile collector)."""
+        data = self.snapshot()
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_operation_seconds Latencia de cada operación de la ingesta.",
+            f"# TYPE {p}_operation_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {name: op["latency"] for name, op in self.operations.items()}
+        for name in sorted(histograms):
+            latency = histograms[name]
+            if not latency.count:
+                # Operaciones que solo tienen contadores
+                continue
+            cumulative = 0
+            for limit, count in zip(list(self.buckets) + ["+Inf"], latency.counts):
+                cumulative += count
+                lines.append(f'{p}_operation_seconds_bucket{{operation="{name}",le="{limit}"}} {cumulative}')
+            lines.append(f'{p}_operation_seconds_sum{{operation="{name}"}} {latency.total:.6f}')
+            lines.append(f'{p}_operation_seconds_count{{operation="{name}"}} {latency.count}')
+
+        lines += [f"# HELP {p}_operation_bytes_total Bytes transferidos por operación.",
+                  f"# TYPE {p}_operation_bytes_total counter"]
+        lines += [f'{p}_operation_bytes_total{{operation="{name}"}} {op["bytes"]}'
+                  for name, op in data["operations"].items() if op["bytes"]]
+
+        lines += [f"# HELP {p}_operation_errors_total Errores por operación y código.",
+                  f"# TYPE {p}_operation_errors_total counter"]
+        for name, op in data["operations"].items():
+            lines += [f'{p}_operation_errors_total{{operation="{name}",code="{code}"}} {count}'
+                      for code, count in sorted(op["errors"].items())]
+
+        lines += [f"# HELP {p}_operation_events_total Contadores por operación (reintentos, aciertos de caché...).",
+                  f"# TYPE {p}_operation_events_total counter"]
+        for name, op in data["operations"].items():
+            lines += [f'{p}_operation_events_total{{operation="{name}",event="{event}"}} {count}'
+                      for event, count in sorted(op["counters"].items())]
+
+        lines += [f"# HELP {p}_run_duration_seconds Duración de la ejecución.",
+                  f"# TYPE {p}_run_duration_seconds gauge",
+                  f"{p}_run_duration_seconds {data['duration_seconds']}",
+                  f"# HELP {p}_last_run_timestamp_seconds Fin de la última ejecución.",
+                  f"# TYPE {p}_last_run_timestamp_seconds gauge",
+                  f"{p}_last_run_timestamp_seconds {time.time():.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, json_path=None, prometheus_path=None):
+        """
+        Guarda el informe en JSON y en formato Prometheus. Se escribe en un fichero
+        temporal y se renombra, para que el collector nunca lea un fichero a medias.
+        """
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.snapshot(), indent=2))
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+
+    def summary(self):
+        """Imprime una tabla con el tiempo que se ha ido en cada operación."""
+        data = self.snapshot()
+        print(f"Métricas de la ejecución ({data['duration_seconds']} s):")
+        ranked = sorted(data["operations"].items(), key=lambda item: item[1]["seconds_total"], reverse=True)
+        for name, op in ranked:
+            errors = sum(op["errors"].values())
+            extra = ", ".join(f"{event}={count}" for event, count in op["counters"].items())
+            if not op["count"]:
+                print(f"  {name}: {extra}")
+                continue
+            print(f"  {name}: {op['count']} llamadas, {op['seconds_total']} s en total, "
+                  f"p50 {op['seconds_p50']} s, p95 {op['seconds_p95']} s, {op['bytes']} bytes, "
+                  f"{errors} errores{', ' + extra if extra else ''}")
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp_path, path)
+
+
+class Progress:
+    """
+    Vista en vivo del avance de una etapa: hechos/total, ritmo y tiempo estimado.
+    Se redibuja en stderr cada 'interval' segundos desde un hilo aparte. Con
+    count() se llevan aparte contadores como los fallos, que se muestran al final.
+    """
+
+    def __init__(self, label, total=None, interval=2.0, stream=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.done = 0
+        self.counters = {}
+        self._started = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def advance(self, amount=1):
+        with self._lock:
+            self.done += amount
+
+    def count(self, event, amount=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    def line(self):
+        elapsed = time.monotonic() - self._started
+        rate = self.done / elapsed if elapsed else 0.0
+        text = f"{self.label}: {self.done}"
+        if self.total:
+            text += f"/{self.total} ({self.done / self.total:.0%})"
+        text += f", {rate:.1f}/s"
+        if self.total and rate:
+            remaining = max(self.total - self.done, 0) / rate
+            text += f", ETA {time.strftime('%H:%M:%S', time.gmtime(remaining))}"
+        for event, count in self.counters.items():
+            text += f", {event} {count}"
+        return text
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.stream.write(f"\r{self.line()}   ")
+            self.stream.flush()
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stream.write(f"\r{self.line()}\n")
+        self.stream.flush()
+
+
+# Registro compartido por toda la ingesta
+metrics = Metrics()
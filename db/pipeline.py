@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+
+# Marca de fin de flujo que cada etapa pasa a la siguiente cuando termina
+_DONE = object()
+
+
+class Stage:
+    """
+    Etapa intermedia del pipeline: 'func' transforma el valor de cada elemento y se
+    ejecuta en 'workers' hilos. Si devuelve None el elemento se descarta como omitido
+    (un plugin que no existe en WPScan, por ejemplo) y no pasa a la siguiente etapa.
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+
+class Pipeline:
+    """
+    Pipeline productor/consumidor: origen -> etapas -> escritor por lotes.
+
+    Las etapas se comunican por colas acotadas ('queue_size'), así que una etapa
+    rápida se frena cuando la siguiente no da abasto. Cada elemento viaja como
+    (clave, valor): la clave es el elemento original del origen y el valor lo van
+    transformando las etapas. El escritor ('sink') recibe listas de hasta
+    'batch_size' pares (clave, valor).
+
+    Un error en un elemento se anota en 'failures' y no detiene el resto; si es
+    de alguno de los tipos de 'stop_on' (por ejemplo QuotaExhausted) se deja de
+    leer del origen y se termina de procesar lo que ya estaba en curso. Las claves
+    escritas se anotan en 'written' y las omitidas en 'skipped'. Si se pasan,
+    on_failure(clave, etapa, error) y on_skip(clave, etapa) se llaman en cuanto
+    ocurre cada fallo u omisión, sin esperar a que termine la ejecución.
+    """
+
+    def __init__(self, stages, sink, batch_size=50, sink_workers=1, queue_size=100, stop_on=(),
+                 on_failure=None, on_skip=None):
+        self.stages = stages
+        self.sink = sink
+        self.batch_size = batch_size
+        self.sink_workers = sink_workers
+        self.queue_size = queue_size
+        self.stop_on = tuple(stop_on)
+        self.on_failure = on_failure
+        self.on_skip = on_skip
+        self.failures = []
+        self.skipped = []
+        self.written = set()
+        self.stats = {stage.name: 0 for stage in stages}
+        self.stats["skipped"] = 0
+        self.stats["written"] = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Deja de leer del origen; lo que ya está en las colas se procesa igualmente."""
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _fail(self, key, stage, error):
+        with self._lock:
+            self.failures.append((key, stage, error))
+        if isinstance(error, self.stop_on):
+            print(f"Deteniendo el pipeline en la etapa {stage}: {error}")
+            self.stop()
+        else:
+            print(f"Error en la etapa {stage} con '{key}': {error}")
+        if self.on_failure:
+            self.on_failure(key, stage, error)
+
+    def _skip(self, key, stage):
+        with self._lock:
+            self.skipped.append((key, stage))
+            self.stats["skipped"] += 1
+        if self.on_skip:
+            self.on_skip(key, stage)
+
+    def _produce(self, source, out):
+        try:
+            for item in source:
+                if self.stopped:
+                    break
+                out.put((item, item))
+        finally:
+            out.put(_DONE)
+
+    def _work(self, stage, inbox, out, remaining):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # El último hilo de la etapa que termina avisa a la siguiente
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    out.put(_DONE)
+                else:
+                    inbox.put(_DONE)
+                return
+            key, value = item
+            try:
+                value = stage.func(value)
+            except Exception as e:
+                self._fail(key, stage.name, e)
+                continue
+            if value is None:
+                self._skip(key, stage.name)
+                continue
+            with self._lock:
+                self.stats[stage.name] += 1
+            out.put((key, value))
+
+    def _write(self, inbox, remaining):
+        batch = []
+        while True:
+            item = inbox.get()
+            done = item is _DONE
+            if not done:
+                batch.append(item)
+            if batch and (done or len(batch) >= self.batch_size):
+                try:
+                    self.sink(batch)
+                    with self._lock:
+                        self.stats["written"] += len(batch)
+                        self.written.update(key for key, _ in batch)
+                except Exception as e:
+                    for key, _ in batch:
+                        self._fail(key, "write", e)
+                batch = []
+            if done:
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if not last:
+                    inbox.put(_DONE)
+                return
+
+    def run(self, source):
+        """
+        Procesa todo el origen y espera a que se vacíen todas las etapas.
+        Devuelve las estadísticas por etapa.
+        """
+        started = time.monotonic()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._produce, args=(source, queues[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(stage, queues[i], queues[i + 1], remaining), daemon=True))
+        remaining = [self.sink_workers]
+        for _ in range(self.sink_workers):
+            threads.append(threading.Thread(target=self._write, args=(queues[-1], remaining), daemon=True))
+
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # Ctrl+C: no se leen más elementos, pero se vacía lo que está en curso
+            print("Interrumpido: terminando el trabajo en curso...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+        self.stats["failed"] = len(self.failures)
+        self.stats["seconds"] = round(time.monotonic() - started, 2)
+        return self.stats
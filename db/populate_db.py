@@ -1,182 +1,114 @@
 from database import neo4j_conn
-from wpscan_api import wpscan, wordpress
-from wpscan_scraper import extract_plugins
-import random
-
-def insert_wordpress_version(version, release_date, changelog_url, status):
-
-    query = """
-    MERGE (wp:WordPressVersion {version: $version})
-    SET wp.release_date = $release_date,
-        wp.changelog_url = $changelog_url,
-        wp.status = $status
-    """
-    neo4j_conn.query(query, {
-        "version": version,
-        "release_date": release_date,
-        "changelog_url": changelog_url,
-        "status": status
-    })
-
-def insert_plugin(slug, name, version, author, last_updated_wp, rating, num_ratings, downloaded, active_installs, homepage, short_description, latest_version_wpscan=None, last_updated_wpscan=None, popular_wpscan=None):
- 
-    query = """
-    MERGE (p:Plugin {slug: $slug})
-    SET p.name = COALESCE($name, p.name),
-        p.version = COALESCE($version, p.version),
-        p.author = COALESCE($author, p.author),
-        p.last_updated_wp = COALESCE($last_updated_wp, p.last_updated_wp),
-        p.rating = COALESCE($rating, p.rating),
-        p.num_ratings = COALESCE($num_ratings, p.num_ratings),
-        p.downloaded = COALESCE($downloaded, p.downloaded),
-        p.active_installs = COALESCE($active_installs, p.active_installs),
-        p.homepage = COALESCE($homepage, p.homepage),
-        p.short_description = COALESCE($short_description, p.short_description),
-        p.latest_version_wpscan = COALESCE($latest_version_wpscan, p.latest_version_wpscan),
-        p.last_updated_wpscan = COALESCE($last_updated_wpscan, p.last_updated_wpscan),
-        p.popular_wpscan = COALESCE($popular_wpscan, p.popular_wpscan)
+from http_client import QuotaExhausted
+from settings import NEO4J_BATCH_SIZE, PLUGIN_STALENESS, VERSION_STALENESS, COMPAT_MODE, INGEST_MARKER
+from settings import JOURNAL_PATH, JOURNAL_MAX_ATTEMPTS, RUN_CACHE_SIZE, CORE_WRITE_BATCH
+from journal import Journal
+from scheduler import QuotaScheduler, load_installed_slugs
+from settings import SCHEDULER_WEIGHTS, SCHEDULER_BACKLOG, SCHEDULER_CORE_RESERVE, SITES_INVENTORY
+import argparse
+import os
+from sync import StalenessPolicy, ChangeDetector, RunCache, plan_sync, now_iso, content_hash
+from compat import version_to_int, extraer_rango_compatibilidad, compat_bounds
+from versions import version_key
+from schema import migrate, require_current_schema
+from pipeline import Pipeline, Stage
+from settings import PIPELINE_FETCH_WORKERS, PIPELINE_TRANSFORM_WORKERS, PIPELINE_WRITE_WORKERS, PIPELINE_WRITE_BATCH, PIPELINE_QUEUE_SIZE
+from metrics import metrics, Progress
+from storage import Neo4jBackend, StagingBackend
+from risk import summarize
+from enrichment import UNWIND_ENRICH, CatalogueEnricher, load_catalogue_dates
+from settings import STAGING_DIR, NEO4J_ADMIN, NEO4J_IMPORT_DATABASE
+from settings import METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH, METRICS_PROGRESS
+
+UNWIND_COMPAT_RANGES = """
+UNWIND $rows AS row
+MATCH (p:Plugin {slug: row.slug})
+SET p.requires = row.requires,
+    p.tested = row.tested,
+    p.requires_int = row.lower_int,
+    p.tested_int = row.upper_int,
+    p.active_installs = COALESCE(row.active_installs, p.active_installs),
+    p.downloaded = COALESCE(row.downloaded, p.downloaded)
+"""
+
+UNWIND_COMPAT_EDGES = """
+UNWIND $rows AS row
+MATCH (p:Plugin {slug: row.slug})
+SET p.requires = row.requires,
+    p.tested = row.tested,
+    p.requires_int = row.lower_int,
+    p.tested_int = row.upper_int,
+    p.active_installs = COALESCE(row.active_installs, p.active_installs),
+    p.downloaded = COALESCE(row.downloaded, p.downloaded)
+WITH p, row
+MATCH (wp:WordPressVersion)
+WHERE wp.version_int >= row.lower_int AND wp.version_int <= row.upper_int
+MERGE (p)-[r:IS_COMPATIBLE]->(wp)
+SET r.compatible = true
+"""
+
+def fetch_all_plugins(mode=COMPAT_MODE, batch_size=NEO4J_BATCH_SIZE):
     """
-    
-    params = {
-        "slug": slug,
-        "name": name,
-        "version": version,
-        "author": author,
-        "last_updated_wp": last_updated_wp,
-        "rating": rating,
-        "num_ratings": num_ratings,
-        "downloaded": downloaded,
-        "active_installs": active_installs,
-        "homepage": homepage,
-        "short_description": short_description,
-        "latest_version_wpscan": latest_version_wpscan,
-        "last_updated_wpscan": last_updated_wpscan,
-        "popular_wpscan": popular_wpscan
-    }
+    Descarga el catálogo de wordpress.org y guarda la compatibilidad de cada plugin.
 
-    neo4j_conn.query(query, params)
+    En los dos modos se guardan los límites requires/tested como enteros en el nodo
+    Plugin, para resolver la compatibilidad con un predicado de rango sobre
+    WordPressVersion.version_int (ver compat.is_compatible). El modo "edges" (por
+    defecto) mantiene además las aristas :IS_COMPATIBLE materializadas, que son las
+    que consulta el plugin de WordPress; "range" deja de crearlas.
 
-def insert_plugin_relationships(plugin_slug, vulnerabilities):
+    En la misma pasada se vuelcan en los nodos Plugin los metadatos del catálogo
+    (nombre, autor, valoración, web...), salvo los de plugins cuyo last_updated no
+    ha cambiado desde la ejecución anterior (ver enrichment.CatalogueEnricher).
     """
-    Crea la relación :HAS_VULNERABILITY entre el nodo Plugin identificado por 'plugin_slug'
-    y cada vulnerabilidad de la lista 'vulnerabilities'.
-    """
-    for v in vulnerabilities:
-        query = """
-        MATCH (p:Plugin {slug: $plugin_slug}), (v:Vulnerability {id: $v_id})
-        MERGE (p)-[:HAS_VULNERABILITY]->(v)
-        """
-        neo4j_conn.query(query, {"plugin_slug": plugin_slug, "v_id": v["id"]})
+    from wpscan_api import wordpress
 
+    if backend.online:
+        require_current_schema()
+    enricher = CatalogueEnricher(load_catalogue_dates() if backend.online else None)
 
-def version_to_int(version):
-    """
-    Convierte una cadena de versión en un entero usando la fórmula:
-      entero = major * 10000 + minor * 100 + patch.
-    Si algún componente no es numérico (por ejemplo, 'x'), se toma como 0.
-    Se asegura además de tener tres componentes, completando con "0" si es necesario.
-    """
-    parts = version.split('.')
-    # Aseguramos que haya 3 partes (completamos con "0" si falta)
-    while len(parts) < 3:
-        parts.append("0")
-    
-    def safe_int(x):
-        try:
-            return int(x)
-        except ValueError:
-            return 0
-
-    major = safe_int(parts[0])
-    minor = safe_int(parts[1])
-    patch = safe_int(parts[2])
-    return major * 10000 + minor * 100 + patch
-
-def extraer_rango_compatibilidad(plugin):
-    """
-    A partir de los atributos 'requires' y 'tested' del plugin,
-    devuelve una tupla (requires_full, tested_full) en formato x.y.z, completando a tres dígitos.
-    
-    La lógica es la siguiente:
-      - Si existe 'requires' pero no 'tested': se devuelve (requires_completo, None)
-      - Si existe 'tested' pero no 'requires': se devuelve ("0.0.0", tested_completo)
-      - Si no existe ninguno: se devuelve (None, None)
-    """
-    requires = plugin.get("requires")
-    tested = plugin.get("tested")
-    
-    # Normalizar requires:
-    if requires and requires.strip():
-        requires = requires.strip()
-        if requires.count('.') == 1:
-            requires_full = requires + ".0"
-        else:
-            requires_full = requires
-    else:
-        requires_full = None
-    
-    # Normalizar tested:
-    if tested and tested.strip():
-        tested = tested.strip()
-        if tested.count('.') == 1:
-            tested_full = tested + ".0"
-        else:
-            tested_full = tested
+    if mode == "edges":
+        # Pocos plugins por transacción: cada uno puede generar cientos de aristas
+        table, flush_size = "compat_edges", 50
     else:
-        tested_full = None
-    
-    return requires_full, tested_full
-
-def fetch_all_plugins():
-    plugins = wordpress.get_all_plugins()
-    
-    for plugin in plugins:
-        slug = plugin.get("slug")
+        table, flush_size = "compat_range", batch_size
+
+    # Los registros se escriben según llegan, sin acumular el catálogo en memoria
+    rows = []
+    enrich_rows = []
+    total = 0
+    for plugin in wordpress.iter_plugins():
+        enrich_row = enricher.row(plugin)
+        if enrich_row:
+            enrich_rows.append(enrich_row)
         requires_full, tested_full = extraer_rango_compatibilidad(plugin)
-        
-        # Determinar el rango de compatibilidad según la lógica definida:
-        if requires_full is None and tested_full is None:
-            # Sin información, se asume que es compatible con todas las versiones
-            lower_int = 0
-            upper_int = 999999
-        elif requires_full and tested_full:
-            lower_int = version_to_int(requires_full)
-            upper_int = version_to_int(tested_full)
-        elif requires_full and not tested_full:
-            lower_int = version_to_int(requires_full)
-            upper_int = 999999  # Compatible desde 'requires' en adelante
-        elif not requires_full and tested_full:
-            lower_int = 0  # Asumimos compatibilidad desde "0.0.0"
-            upper_int = version_to_int(tested_full)
-        else:
-            lower_int = 0
-            upper_int = 999999
-        
-        update_query = """
-            MATCH (p:Plugin {slug: $slug})
-            MATCH (wp:WordPressVersion)
-            WITH p, wp, 
-              (toInteger(split(wp.version, '.')[0]) * 10000 +
-               toInteger(split(wp.version, '.')[1]) * 100 +
-               toInteger(split(wp.version, '.')[2])) AS wp_int
-            WHERE wp_int >= $lower_int AND wp_int <= $upper_int
-            MERGE (p)-[r:IS_COMPATIBLE]->(wp)
-            SET r.compatible = true
-        """
-        neo4j_conn.query(update_query, {
-            "slug": slug,
+        lower_int, upper_int = compat_bounds(plugin)
+        rows.append({
+            "slug": plugin.slug,
+            "requires": requires_full,
+            "tested": tested_full,
             "lower_int": lower_int,
-            "upper_int": upper_int
+            "upper_int": upper_int,
+            # La popularidad la usa el planificador de cuota de WPScan
+            "active_installs": plugin.active_installs,
+            "downloaded": plugin.downloaded,
         })
-
-def insert_vulnerability(v):
- 
-    query = """
-    MERGE (v:Vulnerability {id: $id})
-    SET v.title = $title
+        if len(rows) >= flush_size:
+            backend.write([(table, rows), ("enrich", enrich_rows)], batch_size=flush_size)
+            total += len(rows)
+            rows = []
+            enrich_rows = []
+    backend.write([(table, rows), ("enrich", enrich_rows)], batch_size=flush_size)
+    total += len(rows)
+    print(f"Se ha actualizado la compatibilidad de {total} plugins del catálogo de wordpress.org.")
+    enricher.report()
+    return total
+
+def vulnerability_params(v):
+    """
+    Extrae de una vulnerabilidad de WPScan las propiedades que se guardan en el nodo
+    Vulnerability, descartando los valores None.
     """
-
-    # Diccionario de parámetros con valores predeterminados para evitar errores
     params = {
         "id": v.get("id", "unknown"),  # Si no tiene ID, se asigna "unknown"
         "title": v.get("title", "No title available"),  # Si no tiene título, se asigna un mensaje
@@ -193,130 +125,561 @@ def insert_vulnerability(v):
         "verified": v.get("verified"),
         "fixed_in": v.get("fixed_in"),
         "introduced_in": v.get("introduced_in"),
+        # Claves ordenables (ver versions.version_key) para comparar rangos con índice
+        "fixed_in_key": version_key(v.get("fixed_in")),
+        "introduced_in_key": version_key(v.get("introduced_in")),
         "closed_reason": v.get("closed", {}).get("closed_reason"),
     }
 
     # Filtrar los valores None para evitar que Neo4j inserte valores vacíos
-    params = {key: value for key, value in params.items() if value is not None}
-
-    # Agregar dinámicamente los campos SET a la consulta si existen valores
-    if params:
-        query += "\nSET " + ",\n    ".join([f"v.{key} = ${key}" for key in params.keys() if key not in ["id", "title"]])
-
-    neo4j_conn.query(query, params)
-
-def insert_relationships(version, vulnerabilities):
+    return {key: value for key, value in params.items() if value is not None}
+
+# Escritura por lotes (UNWIND): un payload completo de WPScan, o varios, se escriben
+# en una sola transacción en lugar de una sentencia por vulnerabilidad.
+
+UNWIND_VULNERABILITIES = """
+UNWIND $rows AS row
+MERGE (v:Vulnerability {id: row.id})
+SET v += row.props
+"""
+
+UNWIND_PLUGINS = """
+UNWIND $rows AS row
+MERGE (p:Plugin {slug: row.slug})
+SET p.latest_version_wpscan = COALESCE(row.latest_version_wpscan, p.latest_version_wpscan),
+    p.last_updated_wpscan = COALESCE(row.last_updated_wpscan, p.last_updated_wpscan),
+    p.popular_wpscan = COALESCE(row.popular_wpscan, p.popular_wpscan),
+    p.payload_hash = row.payload_hash,
+    p.last_synced = row.last_synced
+SET p += COALESCE(row.risk, {})
+"""
+
+UNWIND_WORDPRESS_VERSIONS = """
+UNWIND $rows AS row
+MERGE (wp:WordPressVersion {version: row.version})
+SET wp.version_int = row.version_int,
+    wp.release_date = row.release_date,
+    wp.changelog_url = row.changelog_url,
+    wp.status = row.status,
+    wp.payload_hash = row.payload_hash,
+    wp.last_synced = row.last_synced
+SET wp += COALESCE(row.risk, {})
+"""
+
+# Las relaciones se agrupan por vulnerabilidad: una fila por vulnerabilidad con
+# todos sus propietarios, en lugar de una fila por cada par.
+UNWIND_PLUGIN_RELATIONSHIPS = """
+UNWIND $rows AS row
+MATCH (v:Vulnerability {id: row.v_id})
+UNWIND row.owners AS slug
+MATCH (p:Plugin {slug: slug})
+MERGE (p)-[:HAS_VULNERABILITY]->(v)
+"""
+
+UNWIND_VERSION_RELATIONSHIPS = """
+UNWIND $rows AS row
+MATCH (v:Vulnerability {id: row.v_id})
+UNWIND row.owners AS version
+MATCH (wp:WordPressVersion {version: version})
+MERGE (wp)-[:HAS_VULNERABILITY]->(v)
+"""
+
+# Vulnerabilidades ya escritas en esta ejecución, compartida por los pipelines de
+# plugins y de versiones
+run_cache = RunCache(RUN_CACHE_SIZE)
+
+# Muestra el avance de cada pipeline en stderr (se activa también con --progress)
+show_progress = METRICS_PROGRESS
+
+# Payloads sin cambios: solo se anota que se han comprobado
+TOUCH_PLUGINS = """
+UNWIND $rows AS row
+MATCH (p:Plugin {slug: row.key})
+SET p.last_synced = row.last_synced
+"""
+
+TOUCH_WORDPRESS_VERSIONS = """
+UNWIND $rows AS row
+MATCH (wp:WordPressVersion {version: row.key})
+SET wp.last_synced = row.last_synced
+"""
+
+# Sentencia UNWIND de cada tabla de los lotes (ver storage.py)
+WRITE_QUERIES = {
+    "Plugin": UNWIND_PLUGINS,
+    "WordPressVersion": UNWIND_WORDPRESS_VERSIONS,
+    "touch_Plugin": TOUCH_PLUGINS,
+    "touch_WordPressVersion": TOUCH_WORDPRESS_VERSIONS,
+    "Vulnerability": UNWIND_VULNERABILITIES,
+    "HAS_VULNERABILITY_Plugin": UNWIND_PLUGIN_RELATIONSHIPS,
+    "HAS_VULNERABILITY_WordPressVersion": UNWIND_VERSION_RELATIONSHIPS,
+    "compat_range": UNWIND_COMPAT_RANGES,
+    "compat_edges": UNWIND_COMPAT_EDGES,
+    "enrich": UNWIND_ENRICH,
+}
+
+# Destino de las escrituras: Neo4j en línea, o ficheros CSV durante rebuild()
+backend = Neo4jBackend(WRITE_QUERIES, neo4j_conn)
+
+def plugin_row(slug, details):
+    return {
+        "slug": slug,
+        "latest_version_wpscan": details.get("latest_version"),
+        "last_updated_wpscan": details.get("last_updated"),
+        "popular_wpscan": details.get("popular"),
+        "payload_hash": content_hash(details),
+        "last_synced": now_iso(),
+    }
 
-    for v in vulnerabilities:
-        query = """
-        MATCH (wp:WordPressVersion {version: $version}), (v:Vulnerability {id: $v_id})
-        MERGE (wp)-[:HAS_VULNERABILITY]->(v)
-        """
-        neo4j_conn.query(query, {
-            "version": version,
-            "v_id": v["id"]
-        })
+def wordpress_version_row(version, details):
+    return {
+        "version": version,
+        "version_int": version_to_int(version),
+        "release_date": details.get("release_date"),
+        "changelog_url": details.get("changelog_url"),
+        "status": details.get("status"),
+        "payload_hash": content_hash(details),
+        "last_synced": now_iso(),
+    }
 
-def populate_wordpress(version):
-    data = wpscan.get_wordpress_version(version)
-    if data:
-        for v, details in data.items():
-            insert_wordpress_version(v, details["release_date"], details["changelog_url"], details["status"])
-            if "vulnerabilities" in details:
-                for vulnerability in details["vulnerabilities"]:
-                    insert_vulnerability(vulnerability)
-                insert_relationships(v, details["vulnerabilities"])
-        print(f"La versión {version} se ha insertado correctamente en la base de datos.")
+def payload_rows(payloads, kind="plugin", detector=None):
+    """
+    Convierte uno o varios payloads de WPScan ({slug: detalles} para plugins o
+    {versión: detalles} para WordPress) en las filas que escriben las sentencias
+    UNWIND: nodos propietarios, vulnerabilidades (sin duplicados) y relaciones.
+
+    Con un ChangeDetector, los payloads cuyo hash coincide con el guardado solo
+    actualizan last_synced, y de los que cambian solo se reescriben las
+    vulnerabilidades nuevas o modificadas. Las vulnerabilidades que ya están en
+    run_cache (escritas antes en esta misma ejecución) tampoco se repiten.
+    """
+    if payloads is None or isinstance(payloads, dict):
+        payloads = [payloads]
+    if kind == "plugin":
+        make_row = plugin_row
+    elif kind == "wordpress":
+        make_row = wordpress_version_row
     else:
-        print(f"Error 404: No se pudo obtener la versión {version}, {data}")
-
+        raise ValueError(f"Tipo de payload desconocido: {kind}")
+
+    rows = {"kind": kind, "owners": [], "touched": [], "vulnerabilities": {}, "relationships": [],
+            "hashes": {kind: {}, "vulnerability": {}}}
+    for payload in payloads:
+        if not payload:
+            continue
+        for owner, details in payload.items():
+            row = make_row(owner, details)
+            if detector and detector.classify(kind, owner, row["payload_hash"]) == "unchanged":
+                rows["touched"].append({"key": owner, "last_synced": row["last_synced"]})
+                continue
+            rows["owners"].append(row)
+            rows["hashes"][kind][owner] = row["payload_hash"]
+            owner_vulnerabilities = []
+            for v in details.get("vulnerabilities") or []:
+                params = vulnerability_params(v)
+                params["content_hash"] = content_hash(v)
+                owner_vulnerabilities.append(params)
+                rows["relationships"].append({"owner": owner, "v_id": params["id"]})
+                if run_cache.seen(params["id"], params["content_hash"]):
+                    continue
+                if detector and detector.classify("vulnerability", params["id"], params["content_hash"]) == "unchanged":
+                    continue
+                rows["vulnerabilities"][params["id"]] = {"id": params["id"], "props": params}
+                rows["hashes"]["vulnerability"][params["id"]] = params["content_hash"]
+            # Resumen de riesgo materializado en el nodo, solo de los que cambian
+            row["risk"] = summarize(owner_vulnerabilities)
+    return rows
+
+def write_payload_rows(rows_list, batch_size=NEO4J_BATCH_SIZE, detector=None):
+    """
+    Escribe en una única transacción las filas de varios payload_rows del mismo tipo.
+    Si se pasa el ChangeDetector, se le confirman los hashes escritos.
+    Devuelve una tupla (propietarios, vulnerabilidades, relaciones) con lo escrito.
+    """
+    rows_list = [rows for rows in rows_list if rows]
+    if not rows_list:
+        return 0, 0, 0
+    kind = rows_list[0]["kind"]
+    owner_table = "Plugin" if kind == "plugin" else "WordPressVersion"
+
+    owners = []
+    touched = []
+    vulnerabilities = {}
+    relationships = {}
+    for rows in rows_list:
+        owners.extend(rows["owners"])
+        touched.extend(rows["touched"])
+        vulnerabilities.update(rows["vulnerabilities"])
+        for r in rows["relationships"]:
+            relationships.setdefault(r["v_id"], []).append(r["owner"])
+
+    backend.write([
+        (owner_table, owners),
+        (f"touch_{owner_table}", touched),
+        ("Vulnerability", list(vulnerabilities.values())),
+        (f"HAS_VULNERABILITY_{owner_table}", [{"v_id": v_id, "owners": owners} for v_id, owners in relationships.items()]),
+    ], batch_size=batch_size)
+
+    for rows in rows_list:
+        run_cache.add(rows["hashes"]["vulnerability"])
+    if detector:
+        for rows in rows_list:
+            for table, hashes in rows["hashes"].items():
+                detector.commit(table, hashes)
+
+    return len(owners), len(vulnerabilities), sum(len(o) for o in relationships.values())
+
+def load_known_plugins():
+    """
+    Carga en memoria, con una sola consulta, todos los plugins ya guardados:
+    slug -> {"last_synced", "last_updated", "payload_hash", "active_installs", "downloaded"}.
+    """
+    query = """
+    MATCH (p:Plugin)
+    RETURN p.slug AS key, p.last_synced AS last_synced, p.last_updated_wpscan AS last_updated,
+           p.payload_hash AS payload_hash, p.active_installs AS active_installs, p.downloaded AS downloaded
+    """
+    return {r["key"]: r for r in neo4j_conn.fetch_query(query)}
 
+def load_known_versions():
+    """
+    Carga en memoria, con una sola consulta, todas las versiones de WordPress ya
+    guardadas: versión -> {"last_synced", "last_updated"}.
+    """
+    query = """
+    MATCH (wp:WordPressVersion)
+    RETURN wp.version AS key, wp.last_synced AS last_synced, wp.release_date AS last_updated,
+           wp.payload_hash AS payload_hash
+    """
+    return {r["key"]: r for r in neo4j_conn.fetch_query(query)}
 
-def populate_plugin(plugin_slug):
-    data = wpscan.get_plugin(plugin_slug)
+def load_vulnerability_hashes():
+    """Carga en memoria, con una sola consulta, el hash de contenido de cada vulnerabilidad."""
+    query = """
+    MATCH (v:Vulnerability)
+    WHERE v.content_hash IS NOT NULL
+    RETURN v.id AS id, v.content_hash AS content_hash
+    """
+    return {r["id"]: r["content_hash"] for r in neo4j_conn.fetch_query(query)}
 
-    if not data or plugin_slug not in data:
-        print(f"El plugin '{plugin_slug}' no se encuentra en la API de WPScan.")
-        return
+def make_change_detector(kind, known):
+    """ChangeDetector con los hashes de 'known' (load_known_*) y los de las vulnerabilidades."""
+    return ChangeDetector({
+        kind: {key: r["payload_hash"] for key, r in known.items() if r.get("payload_hash")},
+        "vulnerability": load_vulnerability_hashes(),
+    })
 
-    details = data[plugin_slug]
-
-    # Inserta (o actualiza) el nodo del plugin
-    insert_plugin(
-        slug=plugin_slug,
-        name=None,
-        version=None,
-        author=None,
-        last_updated_wp=None,
-        rating=None,
-        num_ratings=None,
-        downloaded=None,
-        active_installs=None,
-        homepage=None,
-        short_description=None,
-        latest_version_wpscan=details.get("latest_version"),
-        last_updated_wpscan=details.get("last_updated"),
-        popular_wpscan=details.get("popular")
+def run_ingest(keys, kind="plugin", journal=None, detector=None):
+    """
+    Descarga e inserta una lista de plugins o versiones con un pipeline por etapas:
+    origen -> descarga HTTP -> transformación a filas -> escritura por lotes en Neo4j.
+    Descarga y escritura se solapan, y las colas acotadas frenan la descarga si
+    Neo4j no da abasto. Si se agota la cuota de WPScan se deja de leer del origen
+    y se escribe lo que ya se había descargado.
+
+    Lo que no existe en WPScan (404) lo descarta la etapa de descarga como omitido;
+    cualquier otro error HTTP es un fallo y se reintenta en la próxima ejecución. Si se
+    pasa un JournalRun, cada lote escrito se anota como completado, y cada omitido
+    y cada fallo con su error en cuanto ocurren, para que --resume no repita
+    trabajo aunque la ejecución se corte. Con un ChangeDetector
+    no se reescribe lo que no ha cambiado desde la última ingesta.
+
+    Devuelve el Pipeline ya ejecutado (estadísticas y fallos por clave).
+    """
+    from wpscan_api import wpscan
+
+    if kind == "plugin":
+        def fetch(slug):
+            data = wpscan.get_plugin(slug)
+            if not data or slug not in data:
+                print(f"El plugin '{slug}' no se encuentra en la API de WPScan.")
+                return None
+            return {slug: data[slug]}
+    else:
+        def fetch(version):
+            data = wpscan.get_wordpress_version(version)
+            if not data:
+                return None
+            return data
+
+    # El avance cuenta cada elemento en cuanto termina de procesarse, sea cual sea
+    # el resultado (listo para escribir, fallido u omitido); lo escrito, los fallos
+    # y los omitidos se muestran como contadores aparte
+    progress = Progress(kind, total=len(keys)).start() if show_progress else None
+
+    @metrics.instrument(f"transform.{kind}")
+    def transform(payload):
+        rows = payload_rows(payload, kind, detector)
+        if progress:
+            progress.advance()
+        return rows
+
+    def fail(key, stage, error):
+        # Se anota en el momento para que un corte no pierda los fallos. Agotar la
+        # cuota no es un fallo del elemento y no debe gastar sus intentos
+        if journal and not isinstance(error, QuotaExhausted):
+            journal.record_failure(kind, key, f"{stage}: {error}")
+        if progress:
+            # Lo que falla al escribir ya se contó al salir de la transformación
+            if stage != "write":
+                progress.advance()
+            progress.count("fallidos")
+
+    def skip(key, stage):
+        if journal:
+            # Solo la descarga omite, y solo ante un 404: el resto de errores son fallos
+            journal.record_skipped(kind, key, f"{stage}: no encontrado (404)")
+        if progress:
+            progress.advance()
+            progress.count("omitidos")
+
+    def write(batch):
+        owners, vulnerabilities, relationships = write_payload_rows([rows for _, rows in batch], detector=detector)
+        if journal:
+            journal.record_done(kind, [key for key, _ in batch])
+        if progress:
+            progress.count("escritos", len(batch))
+        print(f"Lote escrito: {owners} {'plugins' if kind == 'plugin' else 'versiones'}, "
+              f"{vulnerabilities} vulnerabilidades y {relationships} relaciones.")
+
+    pipeline = Pipeline(
+        stages=[
+            Stage("fetch", fetch, workers=PIPELINE_FETCH_WORKERS),
+            Stage("transform", transform, workers=PIPELINE_TRANSFORM_WORKERS),
+        ],
+        sink=write,
+        # El núcleo se escribe en un solo lote para que cada vulnerabilidad compartida
+        # por muchas versiones se escriba una vez con todas sus relaciones
+        batch_size=PIPELINE_WRITE_BATCH if kind == "plugin" else CORE_WRITE_BATCH,
+        sink_workers=PIPELINE_WRITE_WORKERS,
+        queue_size=PIPELINE_QUEUE_SIZE,
+        stop_on=(QuotaExhausted,),
+        on_failure=fail,
+        on_skip=skip,
     )
+    try:
+        stats = pipeline.run(keys)
+    finally:
+        if progress:
+            progress.stop()
+    print(f"Pipeline de {kind}: {stats}")
+    if detector:
+        detector.report()
+    print(f"Caché de la ejecución: {run_cache.hits} vulnerabilidades repetidas no se han reescrito.")
+    if pipeline.stopped:
+        print("Se ha agotado la cuota de WPScan. El resto se procesará en la próxima ejecución.")
+    metrics.count(f"ingest.{kind}", "written", stats["written"])
+    metrics.count(f"ingest.{kind}", "skipped", stats["skipped"])
+    metrics.count(f"ingest.{kind}", "failed", stats["failed"])
+    return pipeline
+
+def check_versions(version_list, policy=None, journal=None):
+    """
+    Compara version_list con las versiones ya guardadas y procesa con el pipeline
+    de ingesta solo las que faltan y las que han caducado según la política de refresco.
+    """
+    require_current_schema()
+    policy = policy or StalenessPolicy(**VERSION_STALENESS)
+    known = load_known_versions()
+    to_insert, to_refresh = plan_sync(version_list, known, policy)
+    print(f"Versiones: {len(to_insert)} nuevas y {len(to_refresh)} por refrescar de {len(version_list)}.")
+    keys = to_insert + to_refresh
+    if journal:
+        keys = journal.pending("wordpress", keys, JOURNAL_MAX_ATTEMPTS)
+    return run_ingest(keys, kind="wordpress", journal=journal, detector=make_change_detector("wordpress", known)).stats
+
+def load_catalogue_popularity(slugs):
+    """
+    active_installs y downloaded del catálogo de wordpress.org para 'slugs', que
+    aún no tienen nodo Plugin, para que el planificador también conozca su
+    popularidad. Las páginas quedan en la caché HTTP y fetch_all_plugins las
+    reutiliza en la misma ejecución.
+    """
+    from wpscan_api import wordpress
+
+    wanted = set(slugs)
+    found = {}
+    if not wanted:
+        return found
+    for plugin in wordpress.iter_plugins():
+        if plugin.slug in wanted:
+            found[plugin.slug] = {"active_installs": plugin.active_installs, "downloaded": plugin.downloaded}
+            if len(found) == len(wanted):
+                break
+    print(f"Catálogo de wordpress.org: popularidad de {len(found)} de {len(wanted)} plugins nuevos.")
+    return found
+
+def check_plugins(plugins_list, policy=None, journal=None, scheduler=None):
+    """
+    Compara plugins_list con los plugins ya guardados y procesa con el pipeline de
+    ingesta solo los que faltan y los que han caducado según la política de refresco.
+
+    El planificador ordena esos plugins por prioridad (popularidad, antigüedad y si
+    están instalados en nuestros sitios; la popularidad de los nuevos sale del
+    catálogo de wordpress.org) y se queda con los que caben en la cuota
+    restante de WPScan (según su /status), reservando SCHEDULER_CORE_RESERVE
+    peticiones para el núcleo. Si la cuota se agota a mitad, lo pendiente se arrastra.
+    """
+    from wpscan_api import wpscan
+
+    require_current_schema()
+    policy = policy or StalenessPolicy(**PLUGIN_STALENESS)
+    known = load_known_plugins()
+    to_insert, to_refresh = plan_sync(plugins_list, known, policy)
+    keys = to_insert + to_refresh
+    if journal:
+        keys = journal.pending("plugin", keys, JOURNAL_MAX_ATTEMPTS)
+    scheduler = scheduler or QuotaScheduler(SCHEDULER_WEIGHTS, load_installed_slugs(SITES_INVENTORY), SCHEDULER_BACKLOG)
+    popularity = load_catalogue_popularity([key for key in keys if key not in known])
+    quota = wpscan.refresh_quota()
+    keys = scheduler.schedule(keys, {**popularity, **known}, None if quota is None else quota - SCHEDULER_CORE_RESERVE)
+    pipeline = run_ingest(keys, kind="plugin", journal=journal, detector=make_change_detector("plugin", known))
+    if pipeline.stopped:
+        # La cuota se ha agotado antes de lo previsto: lo que no se llegó a procesar
+        # pasa al arrastre con la misma prioridad que lo que no cabía en el presupuesto
+        handled = pipeline.written | {key for key, _ in pipeline.skipped}
+        handled |= {key for key, _, error in pipeline.failures if not isinstance(error, QuotaExhausted)}
+        scheduler.defer([key for key in keys if key not in handled])
+
+    failed = {key for key, _, _ in pipeline.failures}
+    written = pipeline.stats["written"]
+    skipped = len(set(plugins_list)) - len(to_insert) - len(to_refresh)
+    print(f"Se han procesado {written} plugins ({len(to_insert)} nuevos y {len(to_refresh)} por refrescar), "
+          f"han fallado {len(failed)}, {pipeline.stats['skipped']} no existen en WPScan "
+          f"y se han omitido {skipped} que estaban al día")
+    return pipeline.stats
+
+def mark_ingest_finished(path=INGEST_MARKER):
+    """Actualiza el marcador que usa audit_service para recargar su snapshot."""
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(now_iso())
 
-    # Para cada vulnerabilidad:
-    if "vulnerabilities" in details:
-        for vulnerability in details["vulnerabilities"]:
-            insert_vulnerability(vulnerability)
-        # Crear la relación entre el plugin y cada vulnerabilidad
-        insert_plugin_relationships(plugin_slug, details["vulnerabilities"])
-
-    print(f"El plugin '{plugin_slug}' ha sido añadido a la base de datos con sus respectivas vulnerabilidades.")
-
-
-def check_versions(version_list):
+def run(resume=False):
+    """
+    Ejecuta la ingesta completa anotando el progreso en el diario. Con resume=True
+    se continúa la última ejecución sin terminar: se saltan las etapas acabadas y,
+    dentro de cada etapa, los plugins y versiones ya completados, y solo se
+    reintentan los fallos.
+    """
+    from wpscan_api import wordpress, http_cache
+
+    journal = Journal(JOURNAL_PATH)
+    current = journal.resume_run() if resume else journal.start_run()
+    migrate()
+
+    try:
+        if not current.stage_done("check_plugins"):
+            with metrics.timer("stage.check_plugins"):
+                plugins = current.load_input("plugins")
+                if plugins is None:
+                    from wpscan_scraper import extract_plugins
+                    plugins = extract_plugins()
+                    current.save_input("plugins", plugins)
+                check_plugins(plugins, journal=current)
+            current.finish_stage("check_plugins")
+
+        if not current.stage_done("check_versions"):
+            with metrics.timer("stage.check_versions"):
+                wp_versions = current.load_input("wp_versions")
+                if wp_versions is None:
+                    wp_versions = wordpress.get_all_versions()
+                    current.save_input("wp_versions", wp_versions)
+                check_versions(wp_versions, journal=current)
+            current.finish_stage("check_versions")
+
+        if not current.stage_done("fetch_all_plugins"):
+            with metrics.timer("stage.fetch_all_plugins"):
+                fetch_all_plugins()
+            current.finish_stage("fetch_all_plugins")
+
+        current.finish()
+        mark_ingest_finished()
+    finally:
+        # El informe se escribe también si la ejecución falla a medias
+        journal.close()
+        if http_cache:
+            http_cache.report()
+        metrics.summary()
+        metrics.write_report(METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH)
+
+class RebuildIncomplete(Exception):
+    """La reconstrucción no ha descargado todo: importarla dejaría un grafo parcial."""
+
+
+def _check_complete(pipeline, kind):
+    """Lanza RebuildIncomplete si el pipeline se paró por la cuota o tuvo fallos."""
+    if pipeline.stopped or pipeline.failures:
+        raise RebuildIncomplete(
+            f"La descarga de {kind} no ha terminado ({len(pipeline.failures)} fallos"
+            f"{', cuota agotada' if pipeline.stopped else ''}). No se importa nada: "
+            f"repite la reconstrucción con --resume cuando haya cuota.")
+
+
+def rebuild(staging_dir=STAGING_DIR, slugs=None, compat_mode=COMPAT_MODE, run_import=False, resume=False):
     """
-    Para cada versión en version_list, comprueba si está en Neo4j.
-    Si no está, llama a populate_wordpress para insertarla.
+    Reconstrucción completa sin pasar por MERGE: descarga plugins, versiones y el
+    catálogo de wordpress.org igual que una ingesta normal, pero lo vuelca a CSV en
+    'staging_dir' (ver storage.StagingBackend) para cargarlo con
+    'neo4j-admin database import full', que reemplaza la base de datos entera.
+
+    El directorio se vacía al empezar; con resume=True se conserva lo descargado
+    en una reconstrucción anterior que no terminó. Si la cuota se agota o falla
+    alguna descarga se lanza RebuildIncomplete antes de escribir los plugins y de
+    importar, porque la importación sobrescribe la base de datos.
+
+    No lee ni escribe en Neo4j: la base de datos tiene que estar parada para la
+    importación. Al arrancarla hay que ejecutar las migraciones de esquema
+    (cli.py migrate) para crear las restricciones y los índices.
     """
-    versions = wp_versions[:]
-    random.shuffle(versions)
-
-    for version in versions:
-        query_check = """
-        MATCH (wp:WordPressVersion {version: $version})
-        RETURN wp LIMIT 1
-        """
-        result = neo4j_conn.fetch_query(query_check, {"version": version})
-
-        if not result:
-            print(f"La versión {version} no está en la base de datos. Insertando...")
-            populate_wordpress(version)
-        else:
-            print(f"La versión {version} ya está en la base de datos. No se hace nada.")
-
-def check_plugins(plugins_list):
-    newP = 0
-    oldP = 0
-
-    plugins_random = plugins_list[:]  
-    random.shuffle(plugins_random)    
-
-    for plugin_slug in plugins_random:
-        query_check = """
-        MATCH (p:Plugin {slug: $slug})
-        RETURN p LIMIT 1
-        """
-        result = neo4j_conn.fetch_query(query_check, {"slug": plugin_slug})
-        
-        if not result:
-            print(f"El plugin '{plugin_slug}' no está en la base de datos. Se añadirá...")
-            populate_plugin(plugin_slug)
-            newP +=1
-        else:
-            print(f"El plugin '{plugin_slug}' ya está en la base de datos. Se omite.")
-            oldP += 1
-
-    print(f"Se han añadido {newP} plugins y se han descartado porque ya estaban {oldP}")
+    from wpscan_api import wordpress
+
+    global backend
+    online, backend = backend, StagingBackend(staging_dir, resume=resume)
+    try:
+        if slugs is None:
+            from wpscan_scraper import extract_plugins
+            slugs = extract_plugins()
+        # Al continuar no se vuelve a gastar cuota en lo que ya está en el directorio
+        staged = backend.staged("plugin")
+        with metrics.timer("stage.rebuild_plugins"):
+            keys = [slug for slug in dict.fromkeys(slugs) if slug not in staged]
+            _check_complete(run_ingest(keys, kind="plugin"), "plugins")
+        staged = backend.staged("wordpress")
+        with metrics.timer("stage.rebuild_versions"):
+            keys = [version for version in wordpress.get_all_versions() if version not in staged]
+            _check_complete(run_ingest(keys, kind="wordpress"), "versiones")
+        with metrics.timer("stage.rebuild_compat"):
+            fetch_all_plugins(mode=compat_mode)
+        backend.finish()
+        staging = backend
+    except RebuildIncomplete:
+        backend.close()
+        raise
+    finally:
+        backend = online
+
+    command = staging.import_command(NEO4J_ADMIN, NEO4J_IMPORT_DATABASE)
+    if not run_import:
+        print("Para cargar los ficheros, con la base de datos parada:")
+        print(f"  {staging.describe_import(NEO4J_ADMIN, NEO4J_IMPORT_DATABASE)}")
+        return command
+    import subprocess
+    print(f"Importando con {staging.describe_import(NEO4J_ADMIN, NEO4J_IMPORT_DATABASE)}")
+    subprocess.run(command, check=True)
+    print("Importación terminada. Arranca la base de datos y ejecuta 'cli.py migrate'.")
+    return command
 
 if __name__ == "__main__":
-    wp_versions = wordpress.get_all_versions()
-    plugins = extract_plugins()
-    check_plugins(plugins)
-    check_versions(wp_versions)
-    fetch_all_plugins()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingesta de plugins, versiones y vulnerabilidades en Neo4j.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continúa la última ejecución sin terminar en lugar de empezar de cero")
+    parser.add_argument("--progress", action="store_true",
+                        help="Muestra el avance de cada etapa con su ritmo y el tiempo estimado")
+    args = parser.parse_args()
+    show_progress = show_progress or args.progress
+    run(resume=args.resume)
@@ -0,0 +1,139 @@
+import json
+
+from database import neo4j_conn
+from sync import now_iso
+from versions import version_key
+
+# Gravedades de CVSS de mayor a menor; las que no están se cuentan como "unknown"
+SEVERITIES = ["critical", "high", "medium", "low"]
+
+# Propiedades de resumen que se guardan en los nodos Plugin y WordPressVersion
+RISK_FIELDS = [
+    "vuln_count", "unfixed_count", "max_cvss", "max_severity",
+    "severity_critical", "severity_high", "severity_medium", "severity_low", "severity_unknown",
+    "vuln_type_counts", "latest_fixed_in", "first_safe_version", "risk_updated",
+]
+
+
+def parse_score(score):
+    """Puntuación CVSS como número, o None si falta o no es numérica ("", "N/A")."""
+    if score is None or isinstance(score, bool):
+        return None
+    try:
+        return float(score)
+    except (TypeError, ValueError):
+        return None
+
+
+def severity_from_score(score):
+    """Gravedad según las bandas de CVSS v3 cuando WPScan no la indica."""
+    score = parse_score(score)
+    if score is None:
+        return None
+    if score >= 9.0:
+        return "critical"
+    if score >= 7.0:
+        return "high"
+    if score >= 4.0:
+        return "medium"
+    if score > 0:
+        return "low"
+    return None
+
+
+def summarize(vulnerabilities):
+    """
+    Resume una lista de vulnerabilidades (con las propiedades de los nodos
+    Vulnerability: score, severity, vuln_type, fixed_in) en las propiedades que se
+    guardan en el nodo propietario:
+
+      - vuln_count, unfixed_count (sin fixed_in),
+      - max_cvss y max_severity,
+      - severity_<gravedad>: cuántas hay de cada gravedad,
+      - vuln_type_counts: JSON {tipo: número},
+      - latest_fixed_in: la versión de corrección más alta,
+      - first_safe_version: la primera versión sin ninguna vulnerabilidad conocida,
+        que es latest_fixed_in si todas están corregidas (None si alguna no lo está
+        o si no hay vulnerabilidades).
+    """
+    summary = {field: 0 for field in ("vuln_count", "unfixed_count")}
+    summary.update({f"severity_{s}": 0 for s in SEVERITIES + ["unknown"]})
+    types = {}
+    max_cvss = None
+    max_rank = None
+    latest_key = None
+    latest_fixed_in = None
+
+    for v in vulnerabilities:
+        summary["vuln_count"] += 1
+        score = parse_score(v.get("score"))
+        if score is not None:
+            max_cvss = score if max_cvss is None else max(max_cvss, score)
+
+        severity = str(v.get("severity") or "").lower() or severity_from_score(score)
+        if severity in SEVERITIES:
+            summary[f"severity_{severity}"] += 1
+            rank = SEVERITIES.index(severity)
+            max_rank = rank if max_rank is None else min(max_rank, rank)
+        else:
+            summary["severity_unknown"] += 1
+
+        vuln_type = v.get("vuln_type") or "UNKNOWN"
+        types[vuln_type] = types.get(vuln_type, 0) + 1
+
+        key = version_key(v.get("fixed_in"))
+        if key is None:
+            summary["unfixed_count"] += 1
+        elif latest_key is None or key > latest_key:
+            latest_key, latest_fixed_in = key, v.get("fixed_in")
+
+    summary["max_cvss"] = max_cvss
+    summary["max_severity"] = SEVERITIES[max_rank] if max_rank is not None else None
+    summary["vuln_type_counts"] = json.dumps(types, sort_keys=True)
+    summary["latest_fixed_in"] = latest_fixed_in
+    summary["first_safe_version"] = (latest_fixed_in if summary["vuln_count"] and not summary["unfixed_count"]
+                                     else None)
+    summary["risk_updated"] = now_iso()
+    return summary
+
+
+# Vulnerabilidades de cada propietario, para recalcular resúmenes desde el grafo
+OWNER_VULNERABILITIES = {
+    "Plugin": ("slug", """
+    MATCH (o:Plugin) WHERE o.slug > $after
+    WITH o ORDER BY o.slug LIMIT $limit
+    OPTIONAL MATCH (o)-[:HAS_VULNERABILITY]->(v:Vulnerability)
+    RETURN o.slug AS key, [x IN collect(v) | {score: x.score, severity: x.severity,
+                                             vuln_type: x.vuln_type, fixed_in: x.fixed_in}] AS vulnerabilities
+    """),
+    "WordPressVersion": ("version", """
+    MATCH (o:WordPressVersion) WHERE o.version > $after
+    WITH o ORDER BY o.version LIMIT $limit
+    OPTIONAL MATCH (o)-[:HAS_VULNERABILITY]->(v:Vulnerability)
+    RETURN o.version AS key, [x IN collect(v) | {score: x.score, severity: x.severity,
+                                                vuln_type: x.vuln_type, fixed_in: x.fixed_in}] AS vulnerabilities
+    """),
+}
+
+
+def backfill_risk_summaries(batch_size=1000):
+    """
+    Calcula los resúmenes de riesgo de todos los plugins y versiones a partir de sus
+    relaciones en el grafo, por páginas de 'batch_size' propietarios. Durante la
+    ingesta se recalculan solo los que cambian (ver populate_db.payload_rows).
+    """
+    for label, (key_field, query) in OWNER_VULNERABILITIES.items():
+        after = ""
+        total = 0
+        while True:
+            page = neo4j_conn.fetch_query(query, {"after": after, "limit": batch_size})
+            if not page:
+                break
+            neo4j_conn.write_batches([(f"""
+            UNWIND $rows AS row
+            MATCH (o:{label} {{{key_field}: row.key}})
+            SET o += row.risk
+            """, [{"key": r["key"], "risk": summarize(r["vulnerabilities"])} for r in page])])
+            total += len(page)
+            after = page[-1]["key"]
+        print(f"Resúmenes de riesgo calculados para {total} nodos {label}.")
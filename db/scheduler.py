@@ -0,0 +1,104 @@
+import json
+import math
+import os
+from datetime import datetime, timezone
+
+from sync import parse_date
+
+# Días a partir de los cuales la antigüedad ya no suma más prioridad
+MAX_STALENESS_DAYS = 365
+# log10 de las instalaciones activas de los plugins más populares (10M+)
+MAX_POPULARITY = 7.0
+# Ejecuciones de espera a partir de las cuales el arrastre ya no suma más
+MAX_CARRY_RUNS = 5
+
+
+def load_installed_slugs(path):
+    """
+    Slugs instalados en nuestros sitios, a partir de un inventario JSON con el mismo
+    formato que acepta audit_service ([{"site", "slug", "version"}, ...]).
+    """
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as fh:
+        items = json.load(fh)
+    return {item["slug"] if isinstance(item, dict) else item[1] for item in items}
+
+
+class QuotaScheduler:
+    """
+    Ordena los plugins candidatos a descargar de WPScan por prioridad y reparte la
+    cuota diaria en ese orden. La prioridad combina:
+
+      - popularidad: active_installs (o downloaded) del catálogo de wordpress.org,
+      - antigüedad: tiempo desde la última sincronización (los nuevos cuentan como
+        los más antiguos),
+      - si el plugin está instalado en alguno de nuestros sitios,
+      - cuántas ejecuciones lleva esperando por falta de cuota.
+
+    Lo que no cabe en la cuota se guarda en 'backlog_path' y gana prioridad en la
+    siguiente ejecución.
+    """
+
+    def __init__(self, weights, installed=None, backlog_path=None):
+        self.weights = weights
+        self.installed = installed or set()
+        self.backlog_path = backlog_path
+        self.backlog = {}
+        if backlog_path and os.path.exists(backlog_path):
+            with open(backlog_path, encoding="utf-8") as fh:
+                self.backlog = json.load(fh)
+
+    def score(self, slug, known, now):
+        info = known.get(slug) or {}
+        installs = info.get("active_installs") or (info.get("downloaded") or 0) / 100
+        popularity = min(math.log10(1 + installs), MAX_POPULARITY) / MAX_POPULARITY
+
+        last_synced = parse_date(info.get("last_synced"))
+        days = MAX_STALENESS_DAYS if last_synced is None else (now - last_synced).total_seconds() / 86400
+        staleness = min(days, MAX_STALENESS_DAYS) / MAX_STALENESS_DAYS
+
+        installed = 1.0 if slug in self.installed else 0.0
+        carry = min(self.backlog.get(slug, 0), MAX_CARRY_RUNS) / MAX_CARRY_RUNS
+
+        w = self.weights
+        return w["popularity"] * popularity + w["staleness"] * staleness + w["installed"] * installed + w["carry"] * carry
+
+    def schedule(self, candidates, known, budget=None, now=None):
+        """
+        Devuelve los candidatos que caben en 'budget' peticiones, de mayor a menor
+        prioridad (todos, ordenados, si no hay límite), y guarda el resto como
+        arrastre para la próxima ejecución.
+        """
+        now = now or datetime.now(timezone.utc)
+        ranked = sorted(set(candidates), key=lambda slug: self.score(slug, known, now), reverse=True)
+        if budget is None:
+            selected, deferred = ranked, []
+        else:
+            selected, deferred = ranked[:max(budget, 0)], ranked[max(budget, 0):]
+
+        self.backlog = {slug: self.backlog.get(slug, 0) + 1 for slug in deferred}
+        self.save()
+        installed = sum(1 for slug in selected if slug in self.installed)
+        print(f"Planificador: {len(selected)} plugins seleccionados ({installed} instalados en nuestros sitios), "
+              f"{len(deferred)} pasan a la próxima ejecución.")
+        return selected
+
+    def defer(self, slugs):
+        """Pasa a la próxima ejecución plugins seleccionados que no se llegaron a procesar."""
+        for slug in slugs:
+            self.backlog[slug] = self.backlog.get(slug, 0) + 1
+        self.save()
+        if slugs:
+            print(f"Planificador: {len(slugs)} plugins sin procesar pasan a la próxima ejecución.")
+
+    def save(self):
+        if not self.backlog_path:
+            return
+        directory = os.path.dirname(self.backlog_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.backlog_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.backlog, fh)
+        os.replace(tmp_path, self.backlog_path)
@@ -0,0 +1,100 @@
+from database import neo4j_conn
+from compat import backfill_version_ints
+from matcher import backfill_version_keys
+from risk import backfill_risk_summaries
+from sync import now_iso
+
+
+class SchemaOutdated(Exception):
+    """La base de datos tiene migraciones de esquema pendientes."""
+
+
+# Migraciones en orden. Cada una es (versión, descripción, pasos); un paso es una
+# sentencia Cypher idempotente o una función sin argumentos (relleno de propiedades).
+MIGRATIONS = [
+    (1, "Restricciones de unicidad de Plugin, Vulnerability y WordPressVersion", [
+        "CREATE CONSTRAINT plugin_slug IF NOT EXISTS FOR (p:Plugin) REQUIRE p.slug IS UNIQUE",
+        "CREATE CONSTRAINT vulnerability_id IF NOT EXISTS FOR (v:Vulnerability) REQUIRE v.id IS UNIQUE",
+        "CREATE CONSTRAINT wordpress_version IF NOT EXISTS FOR (wp:WordPressVersion) REQUIRE wp.version IS UNIQUE",
+    ]),
+    (2, "Índices de compatibilidad por rangos", [
+        "CREATE INDEX wordpress_version_int IF NOT EXISTS FOR (wp:WordPressVersion) ON (wp.version_int)",
+        "CREATE INDEX plugin_requires_int IF NOT EXISTS FOR (p:Plugin) ON (p.requires_int)",
+        "CREATE INDEX plugin_tested_int IF NOT EXISTS FOR (p:Plugin) ON (p.tested_int)",
+        backfill_version_ints,
+    ]),
+    (3, "Claves ordenables de versión en Vulnerability", [
+        "CREATE INDEX vulnerability_fixed_in_key IF NOT EXISTS FOR (v:Vulnerability) ON (v.fixed_in_key)",
+        "CREATE INDEX vulnerability_introduced_in_key IF NOT EXISTS FOR (v:Vulnerability) ON (v.introduced_in_key)",
+        backfill_version_keys,
+    ]),
+    (4, "Índices de sincronización incremental", [
+        "CREATE INDEX plugin_last_synced IF NOT EXISTS FOR (p:Plugin) ON (p.last_synced)",
+        "CREATE INDEX wordpress_version_last_synced IF NOT EXISTS FOR (wp:WordPressVersion) ON (wp.last_synced)",
+    ]),
+    (5, "Resúmenes de riesgo en Plugin y WordPressVersion", [
+        "CREATE INDEX plugin_max_cvss IF NOT EXISTS FOR (p:Plugin) ON (p.max_cvss)",
+        "CREATE INDEX wordpress_version_max_cvss IF NOT EXISTS FOR (wp:WordPressVersion) ON (wp.max_cvss)",
+        backfill_risk_summaries,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Resultado de la última comprobación, para no consultar la base de datos en cada etapa
+_checked_version = None
+
+
+def current_version():
+    """Versión de esquema aplicada en la base de datos (0 si nunca se ha migrado)."""
+    result = neo4j_conn.fetch_query("""
+    MATCH (m:SchemaMigration)
+    RETURN max(m.version) AS version
+    """)
+    return (result[0]["version"] if result else None) or 0
+
+
+def migrate(target=LATEST_VERSION):
+    """
+    Aplica en orden las migraciones pendientes hasta 'target' y anota cada una en un
+    nodo :SchemaMigration. Devuelve la versión final.
+    """
+    global _checked_version
+    version = current_version()
+    for number, description, steps in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        print(f"Aplicando migración de esquema {number}: {description}...")
+        for step in steps:
+            if callable(step):
+                step()
+            else:
+                neo4j_conn.query(step)
+        neo4j_conn.query("""
+        MERGE (m:SchemaMigration {version: $version})
+        SET m.description = $description, m.applied_at = $applied_at
+        """, {"version": number, "description": description, "applied_at": now_iso()})
+        version = number
+    _checked_version = version
+    print(f"Esquema en la versión {version}.")
+    return version
+
+
+def require_current_schema():
+    """
+    Lanza SchemaOutdated si faltan migraciones. Las etapas masivas de populate_db
+    la llaman antes de escribir, porque sin restricciones cada MERGE recorre la
+    etiqueta completa.
+    """
+    global _checked_version
+    if _checked_version is None or _checked_version < LATEST_VERSION:
+        _checked_version = current_version()
+    if _checked_version < LATEST_VERSION:
+        raise SchemaOutdated(
+            f"El esquema está en la versión {_checked_version} y se necesita la {LATEST_VERSION}. "
+            f"Ejecuta 'python schema.py' antes de la ingesta."
+        )
+
+
+if __name__ == "__main__":
+    migrate()
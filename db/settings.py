@@ -8,3 +8,80 @@ BASE_URL =
 NEO4J_URI =
 NEO4J_USER =
 NEO4J_PASSWORD =
+NEO4J_DATABASE = None               # None = base de datos por defecto del servidor
+NEO4J_MAX_POOL_SIZE = 50            # Conexiones del pool compartido por todos los hilos
+NEO4J_FETCH_SIZE = 1000             # Registros que se piden al servidor en cada ida y vuelta
+NEO4J_MAX_RETRY_TIME = 30           # Segundos reintentando errores transitorios
+
+# Ingesta
+NEO4J_BATCH_SIZE = 500
+
+# HTTP
+HTTP_WORKERS = 8            # Peticiones simultáneas
+HTTP_TIMEOUT = 30           # Segundos
+HTTP_MAX_RETRIES = 5        # Reintentos ante errores de red, 429 y 5xx
+WPSCAN_REQUESTS_PER_SECOND = 2
+WPSCAN_DAILY_QUOTA = None   # Peticiones diarias del plan de WPScan (None = sin límite local)
+
+# Política de refresco (ver sync.StalenessPolicy): días tras los que se vuelve a
+# descargar un elemento ya guardado; los actualizados en origen en los últimos
+# 'hot_window_days' caducan antes.
+PLUGIN_STALENESS = {"max_age_days": 7, "hot_max_age_days": 1, "hot_window_days": 30}
+VERSION_STALENESS = {"max_age_days": 30, "hot_max_age_days": 1, "hot_window_days": 180}
+
+# Caché de respuestas HTTP (HTTP_CACHE_PATH = None la desactiva)
+HTTP_CACHE_PATH = ".cache/http_cache.sqlite"
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+HTTP_CACHE_TTLS = {                  # Segundos; un endpoint sin TTL no se cachea
+    "wpscan_plugin": 12 * 3600,
+    "wpscan_wordpress": 12 * 3600,
+    "wordpress_plugins": 24 * 3600,
+    "wordpress_releases": 24 * 3600,
+}
+
+# Compatibilidad plugin/WordPress: los dos modos guardan requires/tested como enteros
+# en el nodo Plugin; "edges" materializa además las aristas IS_COMPATIBLE que consulta
+# el plugin de WordPress (src/views/update_comparison.php). "range" solo cuando las
+# consultas PHP usen los rangos (como compat.is_compatible).
+COMPAT_MODE = "edges"
+
+# Extracción de slugs de wpscan.com: "http" (sin navegador) o "selenium"
+SLUG_HARVEST_MODE = "http"
+HARVEST_WORKERS = 6
+HARVEST_REQUESTS_PER_SECOND = 4
+HARVEST_CHECKPOINT = ".cache/slug_harvest.jsonl"
+
+# Servicio de auditoría (audit_service.py)
+AUDIT_HOST = "127.0.0.1"
+AUDIT_PORT = 8765
+AUDIT_RELOAD_INTERVAL = 30          # Segundos entre comprobaciones del marcador
+INGEST_MARKER = ".cache/last_ingest"  # populate_db lo actualiza al terminar cada ingesta
+
+# Pipeline de ingesta (descarga -> transformación -> escritura por lotes)
+PIPELINE_FETCH_WORKERS = HTTP_WORKERS
+PIPELINE_TRANSFORM_WORKERS = 2
+PIPELINE_WRITE_WORKERS = 1          # Más de un escritor puede provocar bloqueos en Neo4j
+PIPELINE_WRITE_BATCH = 50           # Payloads por transacción
+PIPELINE_QUEUE_SIZE = 100           # Tamaño de cada cola entre etapas
+
+# Diario de progreso para reanudar ejecuciones interrumpidas (populate_db.py --resume)
+JOURNAL_PATH = ".cache/journal.sqlite"
+JOURNAL_MAX_ATTEMPTS = 3            # Intentos por plugin/versión antes de dejarlo para otra ejecución
+CORE_WRITE_BATCH = 1000             # Versiones de WordPress por transacción (todas, en la práctica)
+RUN_CACHE_SIZE = 50000              # Vulnerabilidades recordadas por ejecución para no reescribirlas
+
+# Planificador de la cuota de WPScan (scheduler.py)
+SCHEDULER_WEIGHTS = {"popularity": 1.0, "staleness": 1.0, "installed": 2.0, "carry": 0.5}
+SCHEDULER_BACKLOG = ".cache/scheduler_backlog.json"
+SCHEDULER_CORE_RESERVE = 20         # Peticiones que se reservan para las versiones de WordPress
+SITES_INVENTORY = None              # JSON [{"site", "slug", "version"}, ...] con los plugins de nuestros sitios
+
+# Métricas de la ingesta (metrics.py)
+METRICS_JSON_PATH = ".cache/metrics.json"
+METRICS_PROMETHEUS_PATH = ".cache/populate_db.prom"  # Para el textfile collector de node_exporter
+METRICS_PROGRESS = False            # Avance en vivo de cada etapa (también con --progress)
+
+# Reconstrucción completa con neo4j-admin (populate_db.rebuild, cli.py rebuild)
+STAGING_DIR = ".cache/staging"      # Ficheros CSV para 'neo4j-admin database import'
+NEO4J_ADMIN = "neo4j-admin"
+NEO4J_IMPORT_DATABASE = "neo4j"
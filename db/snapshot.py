@@ -0,0 +1,266 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+from versions import version_key
+
+# Formato del fichero (little endian):
+#   cabecera | índice ordenado | registros de vulnerabilidades | tabla de cadenas
+# El índice tiene una entrada de tamaño fijo por plugin o versión de WordPress,
+# ordenadas por (tipo, clave), para poder buscar por bisección sobre el fichero
+# mapeado. El checksum SHA-256 cubre todo lo que va detrás de la cabecera.
+MAGIC = b"SCSNAP01"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHHQIQQQ32s")
+INDEX_ENTRY = struct.Struct("<BxHIII")      # tipo, longitud clave, offset clave, primer registro, nº registros
+STRING_FIELDS = ("id", "title", "vuln_type", "severity", "introduced_in", "fixed_in", "introduced_in_key", "fixed_in_key")
+RECORD = struct.Struct("<" + "IH" * len(STRING_FIELDS) + "H")
+NO_SCORE = 0xFFFF
+NO_STRING = 0xFFFF      # Longitud que marca un campo None; la cadena vacía se guarda con longitud 0
+
+PLUGIN = 0
+CORE = 1
+KINDS = {"plugin": PLUGIN, "core": CORE}
+
+DELTA_FORMAT = "security-checker-delta/1"
+
+
+def _record_sort_key(record):
+    return (record.get("fixed_in_key") or "~", str(record.get("id")))
+
+
+def write_snapshot(entries, path):
+    """
+    Escribe un snapshot a partir de un diccionario (tipo, clave) -> lista de
+    vulnerabilidades (diccionarios con los campos de STRING_FIELDS y 'score').
+    El contenido es determinista: las mismas entradas producen el mismo checksum.
+    Devuelve el checksum en hexadecimal.
+    """
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(value):
+        if value is None:
+            return 0, NO_STRING
+        data = str(value).encode("utf-8")
+        if len(data) >= NO_STRING:
+            raise ValueError(f"Cadena demasiado larga para el snapshot ({len(data)} bytes).")
+        if data not in string_offsets:
+            string_offsets[data] = len(strings)
+            strings.extend(data)
+        return string_offsets[data], len(data)
+
+    index = bytearray()
+    records = bytearray()
+    record_count = 0
+    for (kind, key) in sorted(entries, key=lambda e: (e[0], e[1].encode("utf-8"))):
+        vulns = sorted(entries[(kind, key)], key=_record_sort_key)
+        key_offset, key_length = add_string(key)
+        index.extend(INDEX_ENTRY.pack(kind, key_length, key_offset, record_count, len(vulns)))
+        for v in vulns:
+            refs = []
+            for field in STRING_FIELDS:
+                refs.extend(add_string(v.get(field)))
+            score = v.get("score")
+            refs.append(NO_SCORE if score is None else min(int(round(float(score) * 10)), NO_SCORE - 1))
+            records.extend(RECORD.pack(*refs))
+            record_count += 1
+
+    index_offset = HEADER.size
+    records_offset = index_offset + len(index)
+    strings_offset = records_offset + len(records)
+    body = bytes(index) + bytes(records) + bytes(strings)
+    checksum = hashlib.sha256(body).digest()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, int(time.time()), len(entries),
+                         index_offset, records_offset, strings_offset, checksum)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(header)
+        fh.write(body)
+    os.replace(tmp_path, path)
+    return checksum.hex()
+
+
+class SnapshotReader:
+    """
+    Lector de snapshots sobre un fichero mapeado en memoria. Solo se leen las
+    entradas del índice que visita la bisección y los registros del resultado.
+    """
+
+    def __init__(self, path):
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, fmt, _flags, self.generated_at, self.count, self.index_offset,
+         self.records_offset, self.strings_offset, checksum) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} no es un snapshot compatible.")
+        self.checksum = checksum.hex()
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def verify(self):
+        """Comprueba que el contenido coincide con el checksum de la cabecera."""
+        return hashlib.sha256(self._mm[HEADER.size:]).hexdigest() == self.checksum
+
+    def _string(self, offset, length):
+        if length == NO_STRING:
+            return None
+        start = self.strings_offset + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _entry(self, position):
+        kind, key_length, key_offset, first, count = INDEX_ENTRY.unpack_from(
+            self._mm, self.index_offset + position * INDEX_ENTRY.size)
+        start = self.strings_offset + key_offset
+        return kind, self._mm[start:start + key_length], first, count
+
+    def _records(self, first, count):
+        records = []
+        for i in range(first, first + count):
+            values = RECORD.unpack_from(self._mm, self.records_offset + i * RECORD.size)
+            record = {field: self._string(values[2 * n], values[2 * n + 1]) for n, field in enumerate(STRING_FIELDS)}
+            record["score"] = None if values[-1] == NO_SCORE else values[-1] / 10
+            records.append(record)
+        return records
+
+    def lookup(self, key, kind="plugin"):
+        """Devuelve las vulnerabilidades de un plugin (o versión, con kind="core")."""
+        target = (KINDS[kind], key.encode("utf-8"))
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_kind, entry_key, first, count = self._entry(middle)
+            if (entry_kind, entry_key) < target:
+                low = middle + 1
+            elif (entry_kind, entry_key) > target:
+                high = middle
+            else:
+                return self._records(first, count)
+        return []
+
+    def affected(self, slug, version):
+        """Vulnerabilidades de 'slug' que afectan a 'version'."""
+        key = version_key(version)
+        if key is None:
+            return []
+        return [r for r in self.lookup(slug)
+                if (r["fixed_in_key"] is None or r["fixed_in_key"] > key)
+                and (r["introduced_in_key"] is None or r["introduced_in_key"] <= key)]
+
+    def entries(self):
+        """Recorre todo el snapshot como tuplas ((tipo, clave), registros)."""
+        for position in range(self.count):
+            kind, key, first, count = self._entry(position)
+            yield (kind, key.decode("utf-8")), self._records(first, count)
+
+
+def export_snapshot(path):
+    """Exporta desde Neo4j el grafo Plugin/WordPressVersion -> Vulnerability a 'path'."""
+    from database import neo4j_conn
+
+    fields = ", ".join(f"v.{field} AS {field}" for field in STRING_FIELDS if field != "id")
+    entries = {}
+    for kind, match in ((PLUGIN, "(o:Plugin)-[:HAS_VULNERABILITY]->(v:Vulnerability) RETURN o.slug AS owner"),
+                        (CORE, "(o:WordPressVersion)-[:HAS_VULNERABILITY]->(v:Vulnerability) RETURN o.version AS owner")):
+        for r in neo4j_conn.fetch_query(f"MATCH {match}, v.id AS id, v.score AS score, {fields}"):
+            owner = r.pop("owner")
+            entries.setdefault((kind, owner), []).append(r)
+
+    checksum = write_snapshot(entries, path)
+    print(f"Snapshot escrito en {path}: {len(entries)} entradas, checksum {checksum}.")
+    return checksum
+
+
+def make_delta(old_path, new_path, delta_path):
+    """
+    Genera un delta comprimido con las entradas que cambian entre dos snapshots.
+    Un sitio con el snapshot antiguo solo necesita descargar el delta.
+    """
+    with SnapshotReader(old_path) as old, SnapshotReader(new_path) as new:
+        old_entries = {key: records for key, records in old.entries()}
+        upsert = []
+        for key, records in new.entries():
+            if old_entries.pop(key, None) != records:
+                upsert.append({"kind": key[0], "key": key[1], "records": records})
+        delta = {
+            "format": DELTA_FORMAT,
+            "base_checksum": old.checksum,
+            "target_checksum": new.checksum,
+            "upsert": upsert,
+            "remove": [{"kind": kind, "key": key} for kind, key in old_entries],
+        }
+    with gzip.open(delta_path, "wt", encoding="utf-8") as fh:
+        json.dump(delta, fh)
+    print(f"Delta escrito en {delta_path}: {len(delta['upsert'])} cambios y {len(delta['remove'])} borrados.")
+
+
+def apply_delta(base_path, delta_path, out_path):
+    """
+    Aplica un delta sobre el snapshot 'base_path' y escribe el resultado en
+    'out_path'. Falla si el snapshot base o el resultado no tienen el checksum esperado.
+    """
+    with gzip.open(delta_path, "rt", encoding="utf-8") as fh:
+        delta = json.load(fh)
+    if delta.get("format") != DELTA_FORMAT:
+        raise ValueError("Formato de delta desconocido.")
+
+    with SnapshotReader(base_path) as base:
+        if base.checksum != delta["base_checksum"]:
+            raise ValueError("El delta no corresponde a este snapshot.")
+        entries = dict(base.entries())
+    for item in delta["remove"]:
+        entries.pop((item["kind"], item["key"]), None)
+    for item in delta["upsert"]:
+        entries[(item["kind"], item["key"])] = item["records"]
+
+    checksum = write_snapshot(entries, out_path)
+    if checksum != delta["target_checksum"]:
+        os.remove(out_path)
+        raise ValueError("El snapshot resultante no coincide con el checksum del delta.")
+    return checksum
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshots offline de vulnerabilidades.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="Exporta el grafo de Neo4j a un snapshot")
+    p.add_argument("path")
+    p = sub.add_parser("delta", help="Genera el delta entre dos snapshots")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("delta")
+    p = sub.add_parser("apply", help="Aplica un delta a un snapshot")
+    p.add_argument("base")
+    p.add_argument("delta")
+    p.add_argument("out")
+    p = sub.add_parser("lookup", help="Consulta un plugin en un snapshot")
+    p.add_argument("path")
+    p.add_argument("slug")
+    p.add_argument("version", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_snapshot(args.path)
+    elif args.command == "delta":
+        make_delta(args.old, args.new, args.delta)
+    elif args.command == "apply":
+        apply_delta(args.base, args.delta, args.out)
+    else:
+        with SnapshotReader(args.path) as reader:
+            found = reader.affected(args.slug, args.version) if args.version else reader.lookup(args.slug)
+            print(json.dumps(found, indent=2, ensure_ascii=False))
@@ -0,0 +1,301 @@
+import csv
+import os
+import shlex
+import sqlite3
+import threading
+
+# Destinos de escritura de populate_db. Los escritores entregan lotes como una
+# lista de (tabla, filas), con estas tablas:
+#
+#   Plugin, WordPressVersion          filas de plugin_row / wordpress_version_row
+#   touch_Plugin, touch_WordPressVersion  {"key", "last_synced"} de lo que no ha cambiado
+#   Vulnerability                     {"id", "props"}
+#   HAS_VULNERABILITY_Plugin, HAS_VULNERABILITY_WordPressVersion  {"v_id", "owners": [...]}
+#   compat_range, compat_edges        filas de compatibilidad de fetch_all_plugins
+#   enrich                            metadatos del catálogo (enrichment.CatalogueEnricher)
+#
+# Neo4jBackend las escribe en línea con las sentencias UNWIND de siempre (las
+# ejecuciones incrementales); StagingBackend las vuelca a ficheros CSV para
+# reconstruir el grafo completo con 'neo4j-admin database import'.
+
+
+class Neo4jBackend:
+    """Escribe cada lote en Neo4j en una transacción, con la sentencia UNWIND de cada tabla."""
+
+    online = True
+
+    def __init__(self, queries, conn=None):
+        self.queries = queries
+        self._conn = conn
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            from database import neo4j_conn
+            self._conn = neo4j_conn
+        return self._conn
+
+    def write(self, tables, batch_size=500):
+        self.conn.write_batches([(self.queries[table], rows) for table, rows in tables], batch_size=batch_size)
+
+    def finish(self):
+        pass
+
+
+# Columnas de cada fichero con la cabecera de neo4j-admin import: (propiedad, tipo)
+PLUGIN_COLUMNS = [
+    ("latest_version_wpscan", None), ("last_updated_wpscan", None), ("popular_wpscan", "boolean"),
+    ("payload_hash", None), ("last_synced", None), ("requires", None), ("tested", None),
+    ("requires_int", "long"), ("tested_int", "long"), ("active_installs", "long"), ("downloaded", "long"),
+    ("name", None), ("version", None), ("author", None), ("last_updated_wp", None), ("rating", "long"),
+    ("num_ratings", "long"), ("homepage", None), ("short_description", None),
+]
+VERSION_COLUMNS = [
+    ("version_int", "long"), ("release_date", None), ("changelog_url", None), ("status", None),
+    ("payload_hash", None), ("last_synced", None),
+]
+# Resumen de riesgo (risk.summarize), común a Plugin y WordPressVersion
+RISK_COLUMNS = [
+    ("vuln_count", "long"), ("unfixed_count", "long"), ("max_cvss", "float"), ("max_severity", None),
+    ("severity_critical", "long"), ("severity_high", "long"), ("severity_medium", "long"),
+    ("severity_low", "long"), ("severity_unknown", "long"), ("vuln_type_counts", None),
+    ("latest_fixed_in", None), ("first_safe_version", None), ("risk_updated", None),
+]
+PLUGIN_COLUMNS += RISK_COLUMNS
+VERSION_COLUMNS += RISK_COLUMNS
+VULNERABILITY_COLUMNS = [
+    ("title", None), ("created_at", None), ("updated_at", None), ("published_date", None),
+    ("description", None), ("vuln_type", None), ("url", "string[]"), ("cve", "string[]"),
+    ("score", "float"), ("vector", None), ("severity", None), ("verified", "boolean"),
+    ("fixed_in", None), ("introduced_in", None), ("fixed_in_key", None), ("introduced_in_key", None),
+    ("closed_reason", None), ("content_hash", None),
+]
+
+# Separador de los valores de las propiedades de tipo lista (url, cve)
+ARRAY_DELIMITER = ";"
+
+# Propiedades del catálogo de wordpress.org que fetch_all_plugins añade a los plugins
+COMPAT_FIELDS = {"requires": "requires", "tested": "tested", "requires_int": "lower_int",
+                 "tested_int": "upper_int", "active_installs": "active_installs", "downloaded": "downloaded"}
+
+
+def _header(id_column, columns):
+    return [id_column] + [f"{name}:{kind}" if kind else name for name, kind in columns] + [":LABEL"]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        # En las URL un ';' codificado es equivalente y no rompe la lista
+        return ARRAY_DELIMITER.join(str(v).replace(ARRAY_DELIMITER, "%3B") for v in value)
+    return value
+
+
+class StagingBackend:
+    """
+    Vuelca los lotes a ficheros CSV con la cabecera que espera
+    'neo4j-admin database import full', para reconstruir el grafo desde cero.
+
+    Vulnerabilidades, versiones y relaciones se escriben según llegan. Lo que ya se
+    ha escrito se recuerda en una base SQLite dentro de 'directory' (no en memoria),
+    así que los duplicados se descartan sin que la memoria crezca con el tamaño del
+    grafo. Al crearlo se borran los CSV y la base SQLite de una reconstrucción
+    anterior, para que no se mezclen filas viejas con las nuevas; con resume=True
+    se conservan y se continúa una reconstrucción interrumpida. Los plugins reciben propiedades de WPScan y del catálogo de
+    wordpress.org en momentos distintos: se acumulan en SQLite y finish() los
+    escribe, junto con las aristas IS_COMPATIBLE si se piden.
+
+    Como con MATCH en Neo4j, la compatibilidad solo se guarda para los plugins que
+    han llegado de WPScan.
+    """
+
+    online = False
+
+    FILES = {
+        "plugins": ("plugins.csv", _header("slug:ID(Plugin)", PLUGIN_COLUMNS)),
+        "versions": ("wordpress_versions.csv", _header("version:ID(WordPressVersion)", VERSION_COLUMNS)),
+        "vulnerabilities": ("vulnerabilities.csv", _header("id:ID(Vulnerability)", VULNERABILITY_COLUMNS)),
+        "plugin_vulnerabilities": ("plugin_vulnerabilities.csv", [":START_ID(Plugin)", ":END_ID(Vulnerability)", ":TYPE"]),
+        "version_vulnerabilities": ("version_vulnerabilities.csv",
+                                    [":START_ID(WordPressVersion)", ":END_ID(Vulnerability)", ":TYPE"]),
+        "compatibility": ("compatibility.csv", [":START_ID(Plugin)", ":END_ID(WordPressVersion)", "compatible:boolean", ":TYPE"]),
+    }
+    NODE_FILES = ("plugins", "versions", "vulnerabilities")
+
+    def __init__(self, directory, resume=False):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if not resume:
+            self.clear()
+        self._db = sqlite3.connect(os.path.join(directory, "staging.sqlite"), check_same_thread=False)
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS seen (kind TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (kind, key));
+            CREATE TABLE IF NOT EXISTS versions (version TEXT PRIMARY KEY, version_int INTEGER);
+            CREATE TABLE IF NOT EXISTS plugins (
+                slug TEXT PRIMARY KEY, wpscan INTEGER NOT NULL DEFAULT 0,
+                {", ".join(f"{name}" for name, _ in PLUGIN_COLUMNS)}
+            );
+        """)
+        self._db.commit()
+        self._writers = {}
+        self._handles = {}
+        self.counts = {}
+        self.compat_edges = False
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Borra los ficheros de una reconstrucción anterior en el directorio."""
+        names = [filename for filename, _ in self.FILES.values()]
+        names += ["staging.sqlite", "staging.sqlite-journal"]
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def staged(self, kind):
+        """Plugins ("plugin") o versiones ("wordpress") ya descargados de WPScan."""
+        if kind == "plugin":
+            cursor = self._db.execute("SELECT slug FROM plugins WHERE wpscan = 1")
+        else:
+            cursor = self._db.execute("SELECT version FROM versions")
+        return {row[0] for row in cursor}
+
+    def _writer(self, name):
+        writer = self._writers.get(name)
+        if writer is None:
+            filename, header = self.FILES[name]
+            path = os.path.join(self.directory, filename)
+            new = not os.path.exists(path) or os.path.getsize(path) == 0
+            handle = open(path, "a", encoding="utf-8", newline="")
+            writer = csv.writer(handle)
+            if new:
+                writer.writerow(header)
+            self._handles[name] = handle
+            self._writers[name] = writer
+        return writer
+
+    def _first_time(self, kind, key):
+        """Anota 'key' y devuelve True si no se había escrito antes."""
+        cursor = self._db.execute("INSERT OR IGNORE INTO seen VALUES (?, ?)", (kind, str(key)))
+        return cursor.rowcount == 1
+
+    def _emit(self, name, row):
+        self._writer(name).writerow(row)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def _stage_plugin(self, row, wpscan):
+        columns = [name for name, _ in PLUGIN_COLUMNS if name in row]
+        values = [row[name] for name in columns]
+        assignments = ", ".join(f"{name} = COALESCE(excluded.{name}, {name})" for name in columns)
+        self._db.execute(
+            f"INSERT INTO plugins (slug, wpscan{''.join(', ' + c for c in columns)}) "
+            f"VALUES (?, ?{', ?' * len(columns)}) "
+            f"ON CONFLICT(slug) DO UPDATE SET wpscan = max(wpscan, excluded.wpscan)"
+            f"{', ' + assignments if assignments else ''}",
+            [row["slug"], 1 if wpscan else 0] + values)
+
+    def write(self, tables, batch_size=None):
+        with self._lock:
+            self._write(tables)
+
+    def _write(self, tables):
+        for table, rows in tables:
+            if not rows:
+                continue
+            if table == "Plugin":
+                for row in rows:
+                    self._stage_plugin(dict(row, **(row.get("risk") or {})), wpscan=True)
+            elif table == "WordPressVersion":
+                for row in rows:
+                    row = dict(row, **(row.get("risk") or {}))
+                    if self._first_time("WordPressVersion", row["version"]):
+                        self._emit("versions", [row["version"]] + [_cell(row.get(name)) for name, _ in VERSION_COLUMNS] + ["WordPressVersion"])
+                        self._db.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)", (row["version"], row.get("version_int")))
+            elif table == "Vulnerability":
+                for row in rows:
+                    if self._first_time("Vulnerability", row["id"]):
+                        props = row["props"]
+                        self._emit("vulnerabilities", [row["id"]] + [_cell(props.get(name)) for name, _ in VULNERABILITY_COLUMNS] + ["Vulnerability"])
+            elif table in ("HAS_VULNERABILITY_Plugin", "HAS_VULNERABILITY_WordPressVersion"):
+                name = "plugin_vulnerabilities" if table.endswith("Plugin") else "version_vulnerabilities"
+                for row in rows:
+                    for owner in row["owners"]:
+                        if self._first_time(table, f"{owner}\x1f{row['v_id']}"):
+                            self._emit(name, [owner, row["v_id"], "HAS_VULNERABILITY"])
+            elif table in ("compat_range", "compat_edges"):
+                self.compat_edges = self.compat_edges or table == "compat_edges"
+                for row in rows:
+                    staged = {"slug": row["slug"]}
+                    staged.update({name: row.get(source) for name, source in COMPAT_FIELDS.items()})
+                    self._stage_plugin(staged, wpscan=False)
+            elif table == "enrich":
+                for row in rows:
+                    self._stage_plugin(row, wpscan=False)
+            elif table.startswith("touch_"):
+                # Sin cambios desde la última ingesta: en una reconstrucción no hay nada que hacer
+                continue
+            else:
+                raise ValueError(f"Tabla desconocida: {table}")
+        for handle in self._handles.values():
+            handle.flush()
+        self._db.commit()
+
+    def finish(self):
+        """Escribe los plugins (y las aristas IS_COMPATIBLE) y cierra los ficheros."""
+        with self._lock:
+            self._finish()
+        print(f"Ficheros de importación en {self.directory}: {self.counts}")
+
+    def _finish(self):
+        columns = [name for name, _ in PLUGIN_COLUMNS]
+        # Se reescribe entero: las propiedades de un plugin pueden haber cambiado
+        path = os.path.join(self.directory, self.FILES["plugins"][0])
+        if os.path.exists(path):
+            os.remove(path)
+        self.counts["plugins"] = 0
+        cursor = self._db.execute(f"SELECT slug, {', '.join(columns)} FROM plugins WHERE wpscan = 1 ORDER BY slug")
+        for row in cursor:
+            self._emit("plugins", [row[0]] + [_cell(bool(v) if kind == "boolean" and v is not None else v)
+                                              for v, (_, kind) in zip(row[1:], PLUGIN_COLUMNS)] + ["Plugin"])
+
+        if self.compat_edges:
+            path = os.path.join(self.directory, self.FILES["compatibility"][0])
+            if os.path.exists(path):
+                os.remove(path)
+            self.counts["compatibility"] = 0
+            cursor = self._db.execute("""
+                SELECT p.slug, v.version FROM plugins p
+                JOIN versions v ON v.version_int BETWEEN p.requires_int AND p.tested_int
+                WHERE p.wpscan = 1
+            """)
+            for slug, version in cursor:
+                self._emit("compatibility", [slug, version, "true", "IS_COMPATIBLE"])
+
+        self.close()
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+        self._writers = {}
+        self._db.commit()
+
+    def import_command(self, neo4j_admin="neo4j-admin", database="neo4j"):
+        """Orden de 'neo4j-admin database import full' que carga los ficheros."""
+        # Títulos, descripciones y short_description pueden llevar saltos de línea:
+        # el módulo csv los deja entre comillas y neo4j-admin tiene que aceptarlos
+        args = [neo4j_admin, "database", "import", "full", "--overwrite-destination", "--skip-duplicate-nodes",
+                "--ignore-empty-strings", "--multiline-fields=true", f"--array-delimiter={ARRAY_DELIMITER}"]
+        for name, (filename, _) in self.FILES.items():
+            path = os.path.join(self.directory, filename)
+            if os.path.exists(path):
+                option = "--nodes" if name in self.NODE_FILES else "--relationships"
+                args.append(f"{option}={path}")
+        args.append(database)
+        return args
+
+    def describe_import(self, neo4j_admin="neo4j-admin", database="neo4j"):
+        return " ".join(shlex.quote(arg) for arg in self.import_command(neo4j_admin, database))
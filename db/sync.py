@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+def now_iso():
+    """Marca de tiempo UTC en formato ISO 8601, tal y como se guarda en los nodos."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def parse_date(value):
+    """
+    Convierte las fechas que devuelven WPScan y Neo4j ("2024-01-10", "2024-01-10T00:00:00.000Z",
+    DateTime de Neo4j...) en un datetime con zona horaria. Devuelve None si no se puede.
+    """
+    if value is None:
+        return None
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class StalenessPolicy:
+    """
+    Decide cuándo hay que volver a descargar algo que ya está en la base de datos.
+
+    Un elemento caduca cuando han pasado más de 'max_age_days' desde la última
+    sincronización ('last_synced'). Los elementos "calientes", cuya fecha de
+    actualización en origen ('last_updated') cae dentro de los últimos
+    'hot_window_days', caducan antes, a los 'hot_max_age_days'. Los nodos que nunca
+    se han sincronizado con esta política (sin 'last_synced') se consideran caducados.
+    """
+
+    def __init__(self, max_age_days, hot_max_age_days=None, hot_window_days=None):
+        self.max_age = timedelta(days=max_age_days)
+        self.hot_max_age = timedelta(days=hot_max_age_days) if hot_max_age_days is not None else None
+        self.hot_window = timedelta(days=hot_window_days) if hot_window_days is not None else None
+
+    def is_stale(self, known, now=None):
+        now = now or datetime.now(timezone.utc)
+        last_synced = parse_date(known.get("last_synced"))
+        if last_synced is None:
+            return True
+
+        max_age = self.max_age
+        if self.hot_max_age is not None and self.hot_window is not None:
+            last_updated = parse_date(known.get("last_updated"))
+            if last_updated is not None and now - last_updated <= self.hot_window:
+                max_age = self.hot_max_age
+        return now - last_synced > max_age
+
+
+def plan_sync(candidates, known, policy, now=None):
+    """
+    Compara la lista de candidatos con lo que ya hay en la base de datos ('known',
+    un diccionario clave -> {"last_synced", "last_updated"}) y devuelve una tupla
+    (to_insert, to_refresh): los que faltan y los que han caducado según 'policy'.
+    Los caducados se devuelven del más antiguo al más reciente.
+    """
+    now = now or datetime.now(timezone.utc)
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+
+    to_insert = []
+    to_refresh = []
+    seen = set()
+    for key in candidates:
+        if key in seen:
+            continue
+        seen.add(key)
+        if key not in known:
+            to_insert.append(key)
+        elif policy.is_stale(known[key], now):
+            to_refresh.append(key)
+
+    to_refresh.sort(key=lambda key: parse_date(known[key].get("last_synced")) or oldest)
+    return to_insert, to_refresh
+
+
+def content_hash(value):
+    """Hash estable (SHA-256 del JSON canónico) de un payload o una vulnerabilidad."""
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ChangeDetector:
+    """
+    Compara los hashes de contenido de lo que llega de WPScan con los guardados en
+    los nodos (cargados en bloque al empezar) para no reescribir lo que no cambia.
+
+    classify() no modifica nada; commit() actualiza los hashes conocidos una vez que
+    la escritura se ha confirmado, para que un lote fallido no se dé por escrito.
+    El informe cuenta cada clave una sola vez por ejecución, aunque aparezca en
+    varios payloads (una vulnerabilidad compartida por muchas versiones, por ejemplo).
+    """
+
+    def __init__(self, known=None):
+        # tabla ("plugin", "wordpress", "vulnerability") -> clave -> hash
+        self.known = {table: dict(hashes) for table, hashes in (known or {}).items()}
+        self.counts = {}
+        self._classified = {}
+        self._lock = threading.Lock()
+
+    def classify(self, table, key, value_hash):
+        """Devuelve "new", "changed" o "unchanged" y lo cuenta para el informe."""
+        with self._lock:
+            previous = self.known.get(table, {}).get(key)
+            status = "new" if previous is None else "unchanged" if previous == value_hash else "changed"
+            counts = self.counts.setdefault(table, {"new": 0, "changed": 0, "unchanged": 0})
+            classified = self._classified.setdefault(table, set())
+            if key not in classified:
+                classified.add(key)
+                counts[status] += 1
+        return status
+
+    def commit(self, table, hashes):
+        with self._lock:
+            self.known.setdefault(table, {}).update(hashes)
+
+    def report(self):
+        for table, counts in self.counts.items():
+            print(f"Cambios en {table}: {counts['new']} nuevos, {counts['changed']} modificados, "
+                  f"{counts['unchanged']} sin cambios.")
+        return {table: dict(counts) for table, counts in self.counts.items()}
+
+
+class RunCache:
+    """
+    Caché LRU acotada de lo ya escrito durante la ejecución (id -> hash de
+    contenido). La comparten todas las rutas de escritura, de modo que una
+    vulnerabilidad de WordPress que aparece en cientos de versiones solo se
+    escribe una vez por ejecución.
+    """
+
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def seen(self, key, value_hash):
+        """Indica si 'key' ya se ha escrito en esta ejecución con el mismo hash."""
+        with self._lock:
+            if self._items.get(key) != value_hash:
+                return False
+            self._items.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, hashes):
+        with self._lock:
+            for key, value_hash in hashes.items():
+                self._items[key] = value_hash
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
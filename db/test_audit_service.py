@@ -0,0 +1,53 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from audit_service import VulnerabilitySnapshot, make_handler
+from versions import version_key
+
+ROWS = [{"slug": "akismet", "id": "v1", "title": "XSS", "vuln_type": "XSS", "score": 6.1, "severity": "medium",
+         "introduced_in": None, "fixed_in": "5.3", "introduced_in_key": None, "fixed_in_key": version_key("5.3")}]
+
+
+class Service:
+    snapshot = VulnerabilitySnapshot(ROWS)
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(Service()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/audit"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_audit_resolves_items(url):
+    status, body = post(url, [{"site": "a", "slug": "akismet", "version": "5.2"}, ["b", "akismet", "5.3"]])
+    assert status == 200
+    assert [len(item["vulnerabilities"]) for item in body] == [1, 0]
+
+
+@pytest.mark.parametrize("payload", [
+    {"slug": "akismet", "version": "5.2"},
+    [{"site": "a", "version": "5.2"}],
+    [{"site": "a", "slug": "akismet"}],
+    [["a", "akismet"]],
+    ["akismet"],
+])
+def test_invalid_batches_get_a_400(url, payload):
+    status, body = post(url, payload)
+    assert status == 400 and "error" in body
@@ -0,0 +1,171 @@
+import pytest
+
+import populate_db
+from benchmark import point_at
+from database import neo4j_conn
+from fake_services import FakeServices, SyntheticCorpus
+from journal import Journal
+from scheduler import QuotaScheduler
+from settings import SCHEDULER_CORE_RESERVE, SCHEDULER_WEIGHTS
+
+CORPUS = SyntheticCorpus(plugins=30, vulns_per_plugin=2, versions=4, core_vulns=3, per_page=50)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Sustituye Neo4j: el grafo está vacío y las escrituras se guardan en una lista."""
+    writes = []
+    monkeypatch.setattr(neo4j_conn, "fetch_query", lambda query, parameters=None: [])
+    monkeypatch.setattr(neo4j_conn, "write_batches",
+                        lambda statements, batch_size=500: writes.append(list(statements)))
+    monkeypatch.setattr(populate_db, "require_current_schema", lambda: None)
+    monkeypatch.setattr(populate_db, "run_cache", populate_db.RunCache())
+    return writes
+
+
+def serve(quota=None):
+    services = FakeServices(CORPUS, quota=quota).start()
+    point_at(services)
+    return services
+
+
+def test_unknown_slug_is_skipped_and_journalled(tmp_path, written):
+    services = serve()
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    run = journal.start_run()
+    try:
+        keys = CORPUS.slugs[:5] + ["does-not-exist"]
+        pipeline = populate_db.run_ingest(keys, kind="plugin", journal=run)
+    finally:
+        services.stop()
+
+    assert pipeline.stats["written"] == 5 and pipeline.stats["skipped"] == 1
+    assert not pipeline.failures
+    assert run.pending("plugin", keys, max_attempts=3) == []
+    owners = [row["slug"] for batch in written for query, rows in batch
+              if query == populate_db.UNWIND_PLUGINS for row in rows]
+    assert sorted(owners) == sorted(CORPUS.slugs[:5])
+    journal.close()
+
+
+
+def test_server_errors_are_failures_not_skips(tmp_path, monkeypatch, written):
+    from wpscan_api import wpscan
+
+    monkeypatch.setattr(wpscan.client, "max_retries", 0)
+    services = FakeServices(CORPUS, error_rate=1.0).start()
+    point_at(services)
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    run = journal.start_run()
+    try:
+        keys = CORPUS.slugs[:5]
+        pipeline = populate_db.run_ingest(keys, kind="plugin", journal=run)
+    finally:
+        services.stop()
+
+    # Un 503 no dice que el plugin no exista: se reintenta en la próxima ejecución
+    assert pipeline.stats["skipped"] == 0 and pipeline.stats["failed"] == 5
+    assert sorted(run.pending("plugin", keys, max_attempts=3)) == sorted(keys)
+    journal.close()
+
+
+def test_resume_retries_server_errors_but_not_404(tmp_path, monkeypatch, written):
+    from wpscan_api import wpscan
+
+    monkeypatch.setattr(wpscan.client, "max_retries", 0)
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    run = journal.start_run()
+    keys = CORPUS.slugs[:3] + ["does-not-exist"]
+    for error_rate in (1.0, 0.0):
+        services = FakeServices(CORPUS, error_rate=error_rate).start()
+        point_at(services)
+        try:
+            populate_db.run_ingest(run.pending("plugin", keys, max_attempts=3), kind="plugin", journal=run)
+        finally:
+            services.stop()
+
+    assert run.completed("plugin") == set(CORPUS.slugs[:3])
+    assert run.skipped("plugin") == {"does-not-exist"}
+    assert run.pending("plugin", keys, max_attempts=3) == []
+    journal.close()
+
+def test_core_vulnerabilities_are_written_once(written):
+    services = serve()
+    try:
+        versions = [CORPUS.versions[i] for i in range(4)]
+        populate_db.run_ingest(versions, kind="wordpress")
+    finally:
+        services.stop()
+
+    vulnerability_ids = [row["id"] for batch in written for query, rows in batch
+                         if query == populate_db.UNWIND_VULNERABILITIES for row in rows]
+    assert len(vulnerability_ids) == len(set(vulnerability_ids))
+
+
+def test_budget_comes_from_wpscan_status():
+    from wpscan_api import wpscan
+
+    services = serve(quota=8)
+    services.quota_used = 5  # Otra ejecución del mismo día
+    try:
+        assert wpscan.refresh_quota() == 3
+    finally:
+        services.stop()
+        wpscan.client.set_quota(None)
+
+
+def test_quota_429_stops_and_carries_over(tmp_path, monkeypatch, written):
+    from wpscan_api import wpscan
+
+    # /status no dice nada, pero el servidor corta con 429 a la octava petición
+    monkeypatch.setattr(wpscan, "refresh_quota", lambda: None)
+    services = serve(quota=8)
+    scheduler = QuotaScheduler(SCHEDULER_WEIGHTS, backlog_path=str(tmp_path / "backlog.json"))
+    try:
+        stats = populate_db.check_plugins(CORPUS.slugs, scheduler=scheduler)
+    finally:
+        services.stop()
+        wpscan.client.set_quota(None)
+
+    assert stats["written"] == 8
+    assert len(scheduler.backlog) == len(CORPUS.slugs) - 8
+
+
+def test_rebuild_stopped_by_quota_does_not_import(tmp_path, monkeypatch):
+    import subprocess
+    from wpscan_api import wpscan
+
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: calls.append(args))
+    services = serve(quota=8)
+    try:
+        with pytest.raises(populate_db.RebuildIncomplete):
+            populate_db.rebuild(str(tmp_path), slugs=CORPUS.slugs, run_import=True)
+    finally:
+        services.stop()
+        wpscan.client.set_quota(None)
+
+    assert calls == []
+    # finish() no ha llegado a escribir los plugins
+    assert not (tmp_path / "plugins.csv").exists()
+    assert populate_db.backend.online
+
+
+def test_unseen_plugins_are_ranked_by_catalogue_popularity(tmp_path, monkeypatch, written):
+    from wpscan_api import wpscan
+
+    # Ningún plugin está en Neo4j: la popularidad solo puede salir del catálogo
+    monkeypatch.setattr(wpscan, "refresh_quota", lambda: SCHEDULER_CORE_RESERVE + 5)
+    weights = {"popularity": 1.0, "staleness": 0.0, "installed": 0.0, "carry": 0.0}
+    scheduler = QuotaScheduler(weights, backlog_path=str(tmp_path / "backlog.json"))
+    services = serve()
+    try:
+        populate_db.check_plugins(CORPUS.slugs, scheduler=scheduler)
+    finally:
+        services.stop()
+
+    installs = {p["slug"]: p["active_installs"] for p in CORPUS.catalogue_page(1)["plugins"]}
+    selected = {row["slug"] for batch in written for query, rows in batch
+                if query == populate_db.UNWIND_PLUGINS for row in rows}
+    assert len(selected) == 5
+    assert min(installs[slug] for slug in selected) >= max(installs[slug] for slug in scheduler.backlog)
@@ -0,0 +1,41 @@
+from journal import Journal
+
+
+def test_pending_skips_completed_skipped_and_exhausted(tmp_path):
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    run = journal.start_run()
+    run.record_done("plugin", ["done"])
+    run.record_skipped("plugin", "missing", "fetch: no encontrado")
+    for _ in range(3):
+        run.record_failure("plugin", "broken", "fetch: 500")
+    run.record_failure("plugin", "flaky", "fetch: timeout")
+    run.record_failure("plugin", "recovered", "fetch: timeout")
+    run.record_done("plugin", ["recovered"])
+
+    keys = ["done", "missing", "broken", "flaky", "recovered", "new"]
+    assert run.pending("plugin", keys, max_attempts=3) == ["flaky", "new"]
+    assert run.pending("plugin", keys, max_attempts=4) == ["broken", "flaky", "new"]
+    assert run.failures("plugin") == {"broken": 3, "flaky": 1}
+    # Otro tipo no se ve afectado
+    assert run.pending("wordpress", ["done"], max_attempts=3) == ["done"]
+    journal.close()
+
+
+def test_resume_continues_the_unfinished_run(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    journal = Journal(path)
+    first = journal.start_run()
+    first.record_done("wordpress", ["6.4.1"])
+    first.finish_stage("check_plugins")
+    first.save_input("wp_versions", ["6.4.1", "6.4.2"])
+    journal.close()
+
+    journal = Journal(path)
+    resumed = journal.resume_run()
+    assert resumed.run_id == first.run_id
+    assert resumed.stage_done("check_plugins") and not resumed.stage_done("check_versions")
+    assert resumed.load_input("wp_versions") == ["6.4.1", "6.4.2"]
+    assert resumed.pending("wordpress", ["6.4.1", "6.4.2"], 3) == ["6.4.2"]
+    resumed.finish()
+    assert journal.resume_run().run_id != first.run_id
+    journal.close()
@@ -0,0 +1,80 @@
+import threading
+
+from pipeline import Pipeline, Stage
+
+
+class Stop(Exception):
+    pass
+
+
+def collect(batches):
+    def sink(batch):
+        batches.append([key for key, _ in batch])
+    return sink
+
+
+def test_failures_and_skips_do_not_stop_the_rest():
+    batches, failed, skipped = [], [], []
+
+    def fetch(n):
+        if n == 3:
+            raise ValueError("roto")
+        return None if n == 5 else n * 10
+
+    pipeline = Pipeline([Stage("fetch", fetch, workers=3), Stage("double", lambda v: v * 2)],
+                        sink=collect(batches), batch_size=4,
+                        on_failure=lambda key, stage, error: failed.append((key, stage)),
+                        on_skip=lambda key, stage: skipped.append((key, stage)))
+    stats = pipeline.run(range(10))
+
+    assert sorted(k for batch in batches for k in batch) == [0, 1, 2, 4, 6, 7, 8, 9]
+    assert all(len(batch) <= 4 for batch in batches)
+    assert pipeline.written == {0, 1, 2, 4, 6, 7, 8, 9}
+    assert failed == [(3, "fetch")] and skipped == [(5, "fetch")]
+    assert [(key, stage) for key, stage, _ in pipeline.failures] == [(3, "fetch")]
+    assert (stats["fetch"], stats["skipped"], stats["written"], stats["failed"]) == (8, 1, 8, 1)
+
+
+def test_sink_errors_fail_the_whole_batch():
+    def sink(batch):
+        raise RuntimeError("Neo4j caído")
+
+    pipeline = Pipeline([Stage("fetch", lambda n: n)], sink=sink, batch_size=2)
+    stats = pipeline.run(range(3))
+    assert sorted(key for key, stage, _ in pipeline.failures if stage == "write") == [0, 1, 2]
+    assert stats["written"] == 0 and not pipeline.written
+
+
+def test_stop_on_error_stops_reading_the_source():
+    read = []
+    batches = []
+
+    def source():
+        for n in range(1000):
+            read.append(n)
+            yield n
+
+    def fetch(n):
+        if n == 2:
+            raise Stop("cuota agotada")
+        return n
+
+    pipeline = Pipeline([Stage("fetch", fetch)], sink=collect(batches), batch_size=1, queue_size=1, stop_on=(Stop,))
+    pipeline.run(source())
+
+    assert pipeline.stopped
+    assert len(read) < 1000
+    # Lo que ya estaba en curso se termina de escribir
+    assert {0, 1} <= pipeline.written
+
+
+def test_items_keep_their_source_key_across_stages():
+    seen = {}
+    lock = threading.Lock()
+
+    def sink(batch):
+        with lock:
+            seen.update(batch)
+
+    Pipeline([Stage("a", lambda s: s.upper(), workers=2), Stage("b", lambda s: s + "!")], sink=sink).run(["x", "y"])
+    assert seen == {"x": "X!", "y": "Y!"}
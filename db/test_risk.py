@@ -0,0 +1,13 @@
+from risk import summarize
+
+
+def test_summary_ignores_missing_and_non_numeric_scores():
+    summary = summarize([
+        {"score": "", "severity": None, "vuln_type": "XSS", "fixed_in": "1.2"},
+        {"score": "N/A", "severity": "High", "vuln_type": "XSS", "fixed_in": None},
+        {"score": "7.5", "severity": None, "vuln_type": "SQLI", "fixed_in": "1.10"},
+    ])
+    assert summary["max_cvss"] == 7.5
+    assert summary["severity_high"] == 2 and summary["severity_unknown"] == 1
+    assert summary["max_severity"] == "high"
+    assert summary["unfixed_count"] == 1 and summary["latest_fixed_in"] == "1.10"
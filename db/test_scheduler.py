@@ -0,0 +1,47 @@
+import json
+from datetime import datetime, timezone
+
+from scheduler import QuotaScheduler
+
+NOW = datetime(2026, 1, 31, tzinfo=timezone.utc)
+WEIGHTS = {"popularity": 1.0, "staleness": 1.0, "installed": 2.0, "carry": 0.5}
+KNOWN = {
+    "popular": {"active_installs": 5_000_000, "last_synced": "2026-01-30T00:00:00+00:00"},
+    "stale": {"active_installs": 100, "last_synced": "2025-02-01T00:00:00+00:00"},
+    "fresh": {"active_installs": 100, "last_synced": "2026-01-30T00:00:00+00:00"},
+    "ours": {"active_installs": 10, "last_synced": "2026-01-30T00:00:00+00:00"},
+}
+
+
+def test_schedule_orders_by_priority_and_respects_budget(tmp_path):
+    backlog = tmp_path / "backlog.json"
+    scheduler = QuotaScheduler(WEIGHTS, installed={"ours"}, backlog_path=str(backlog))
+
+    assert scheduler.schedule(list(KNOWN), KNOWN, budget=None, now=NOW) == ["ours", "stale", "popular", "fresh"]
+    selected = scheduler.schedule(list(KNOWN) + ["ours"], KNOWN, budget=2, now=NOW)
+    assert selected == ["ours", "stale"]
+    assert json.loads(backlog.read_text()) == {"popular": 1, "fresh": 1}
+
+
+def test_carry_over_raises_priority_next_run(tmp_path):
+    backlog = tmp_path / "backlog.json"
+    known = {"a": KNOWN["fresh"], "b": KNOWN["fresh"]}
+    first = QuotaScheduler(WEIGHTS, backlog_path=str(backlog))
+    [chosen] = first.schedule(["a", "b"], known, budget=1, now=NOW)
+    deferred = "b" if chosen == "a" else "a"
+
+    second = QuotaScheduler(WEIGHTS, backlog_path=str(backlog))
+    assert second.schedule(["a", "b"], known, budget=1, now=NOW) == [deferred]
+
+
+def test_defer_adds_unprocessed_plugins_to_the_backlog(tmp_path):
+    backlog = tmp_path / "backlog.json"
+    scheduler = QuotaScheduler(WEIGHTS, backlog_path=str(backlog))
+    scheduler.schedule(["popular", "fresh"], KNOWN, budget=1, now=NOW)
+    scheduler.defer(["popular"])
+    assert json.loads(backlog.read_text()) == {"fresh": 1, "popular": 1}
+
+
+def test_negative_budget_selects_nothing():
+    scheduler = QuotaScheduler(WEIGHTS)
+    assert scheduler.schedule(["popular"], KNOWN, budget=-5, now=NOW) == []
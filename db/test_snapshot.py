@@ -0,0 +1,60 @@
+import pytest
+
+from snapshot import CORE, PLUGIN, SnapshotReader, apply_delta, make_delta, write_snapshot
+
+
+def vuln(id, fixed_in, **extra):
+    record = {"id": id, "title": f"Vulnerabilidad {id}", "vuln_type": "XSS", "severity": "high",
+              "introduced_in": None, "fixed_in": fixed_in, "introduced_in_key": None,
+              "fixed_in_key": f"k-{fixed_in}" if fixed_in else None, "score": 7.5}
+    record.update(extra)
+    return record
+
+
+BASE = {
+    (PLUGIN, "akismet"): [vuln("a1", "4.1"), vuln("a2", None)],
+    (PLUGIN, "contact-form-7"): [vuln("c1", "", title="")],
+    (CORE, "6.4.1"): [vuln("w1", "6.4.2", score=None)],
+}
+
+
+def test_round_trip_keeps_empty_strings_and_none(tmp_path):
+    path = tmp_path / "base.snap"
+    checksum = write_snapshot(BASE, path)
+
+    with SnapshotReader(path) as reader:
+        assert reader.verify()
+        assert reader.checksum == checksum
+        assert dict(reader.entries()) == BASE
+        [record] = reader.lookup("contact-form-7")
+        assert record["fixed_in"] == "" and record["title"] == ""
+        assert reader.lookup("akismet")[1]["fixed_in"] is None
+        assert reader.lookup("6.4.1", kind="core")[0]["score"] is None
+        assert reader.lookup("no-existe") == []
+
+    # El mismo contenido, releído y reescrito, da el mismo checksum
+    with SnapshotReader(path) as reader:
+        assert write_snapshot(dict(reader.entries()), tmp_path / "again.snap") == checksum
+
+
+def test_delta_applies_to_base(tmp_path):
+    new = dict(BASE)
+    new[(PLUGIN, "akismet")] = [vuln("a1", "4.1"), vuln("a3", "")]
+    new[(PLUGIN, "jetpack")] = [vuln("j1", "12.0", introduced_in="")]
+    del new[(CORE, "6.4.1")]
+    write_snapshot(BASE, tmp_path / "old.snap")
+    target = write_snapshot(new, tmp_path / "new.snap")
+
+    make_delta(tmp_path / "old.snap", tmp_path / "new.snap", tmp_path / "delta.gz")
+    assert apply_delta(tmp_path / "old.snap", tmp_path / "delta.gz", tmp_path / "out.snap") == target
+    with SnapshotReader(tmp_path / "out.snap") as reader:
+        assert dict(reader.entries()) == new
+
+
+def test_delta_rejects_other_base(tmp_path):
+    write_snapshot(BASE, tmp_path / "old.snap")
+    write_snapshot({}, tmp_path / "new.snap")
+    make_delta(tmp_path / "old.snap", tmp_path / "new.snap", tmp_path / "delta.gz")
+    write_snapshot({(PLUGIN, "otro"): []}, tmp_path / "other.snap")
+    with pytest.raises(ValueError):
+        apply_delta(tmp_path / "other.snap", tmp_path / "delta.gz", tmp_path / "out.snap")
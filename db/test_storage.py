@@ -0,0 +1,108 @@
+import csv
+import os
+
+from compat import version_to_int
+from storage import StagingBackend
+
+
+def read_csv(directory, filename):
+    with open(os.path.join(directory, filename), encoding="utf-8", newline="") as fh:
+        return list(csv.reader(fh))
+
+
+def test_multiline_fields_survive_staging(tmp_path):
+    backend = StagingBackend(str(tmp_path))
+    title = 'XSS almacenado en "Ajustes"\nsegunda línea'
+    description = "Primera línea\r\nSegunda línea"
+    backend.write([
+        ("Vulnerability", [{"id": "v1", "props": {"title": title, "description": description}}]),
+        ("Plugin", [{"slug": "akismet", "payload_hash": "h"}]),
+        ("enrich", [{"slug": "akismet", "short_description": "Antispam\ncon dos líneas"}]),
+    ])
+    backend.finish()
+
+    header, row = read_csv(tmp_path, "vulnerabilities.csv")
+    assert row[0] == "v1"
+    assert row[header.index("title")] == title
+    assert row[header.index("description")] == description
+    header, row = read_csv(tmp_path, "plugins.csv")
+    assert row[header.index("short_description")] == "Antispam\ncon dos líneas"
+
+    assert "--multiline-fields=true" in backend.import_command()
+
+
+def stage_sample(directory, compat_table="compat_edges"):
+    backend = StagingBackend(str(directory))
+    backend.write([
+        ("Plugin", [{"slug": "akismet", "payload_hash": "h", "risk": {"vuln_count": 2, "max_cvss": 7.5}}]),
+        ("WordPressVersion", [{"version": v, "version_int": version_to_int(v)} for v in ("6.4.1", "6.5.0")]),
+        ("Vulnerability", [{"id": "v1", "props": {"title": "XSS", "cve": ["2024-1", "2024-2"], "verified": True}},
+                           {"id": "v2", "props": {"title": "SQLi"}}]),
+        ("HAS_VULNERABILITY_Plugin", [{"v_id": "v1", "owners": ["akismet"]}, {"v_id": "v2", "owners": ["akismet"]}]),
+        ("HAS_VULNERABILITY_WordPressVersion", [{"v_id": "v1", "owners": ["6.4.1", "6.5.0"]}]),
+        ("touch_Plugin", [{"key": "akismet", "last_synced": "ahora"}]),
+    ])
+    # Lo repetido en otro lote no se vuelve a escribir
+    backend.write([
+        ("Vulnerability", [{"id": "v1", "props": {"title": "XSS"}}]),
+        ("HAS_VULNERABILITY_Plugin", [{"v_id": "v1", "owners": ["akismet"]}]),
+    ])
+    backend.write([(compat_table, [
+        {"slug": "akismet", "requires": "6.0", "tested": "6.4.1",
+         "lower_int": version_to_int("6.0"), "upper_int": version_to_int("6.4.1")},
+        # No ha llegado de WPScan: no se exporta, igual que MATCH no lo encontraría
+        {"slug": "solo-catalogo", "requires": "5.0", "tested": "6.5",
+         "lower_int": version_to_int("5.0"), "upper_int": version_to_int("6.5")},
+    ])])
+    backend.finish()
+    return backend
+
+
+def test_staging_writes_import_ready_csv(tmp_path):
+    backend = stage_sample(tmp_path)
+
+    header, *rows = read_csv(tmp_path, "vulnerabilities.csv")
+    assert header[0] == "id:ID(Vulnerability)" and header[-1] == ":LABEL"
+    assert "cve:string[]" in header and "verified:boolean" in header
+    assert [row[0] for row in rows] == ["v1", "v2"]
+    assert rows[0][header.index("cve:string[]")] == "2024-1;2024-2"
+    assert rows[0][header.index("verified:boolean")] == "true"
+
+    header, *rows = read_csv(tmp_path, "plugins.csv")
+    assert [row[0] for row in rows] == ["akismet"]
+    plugin = dict(zip(header, rows[0]))
+    assert plugin["requires_int:long"] == str(version_to_int("6.0")) and plugin["tested"] == "6.4.1"
+    assert plugin["vuln_count:long"] == "2" and plugin["max_cvss:float"] == "7.5"
+
+    assert read_csv(tmp_path, "plugin_vulnerabilities.csv")[1:] == [
+        ["akismet", "v1", "HAS_VULNERABILITY"], ["akismet", "v2", "HAS_VULNERABILITY"]]
+    assert len(read_csv(tmp_path, "version_vulnerabilities.csv")) == 3
+    assert read_csv(tmp_path, "compatibility.csv")[1:] == [["akismet", "6.4.1", "true", "IS_COMPATIBLE"]]
+
+    command = backend.import_command("neo4j-admin", "graph")
+    assert command[-1] == "graph"
+    assert f"--nodes={os.path.join(str(tmp_path), 'plugins.csv')}" in command
+    assert f"--relationships={os.path.join(str(tmp_path), 'compatibility.csv')}" in command
+
+
+def test_range_mode_writes_no_compatibility_edges(tmp_path):
+    stage_sample(tmp_path, compat_table="compat_range")
+    assert not os.path.exists(os.path.join(str(tmp_path), "compatibility.csv"))
+
+
+def test_new_staging_starts_empty_unless_resumed(tmp_path):
+    vulnerability = {"id": "v1", "props": {"title": "XSS"}}
+    backend = StagingBackend(str(tmp_path))
+    backend.write([("Vulnerability", [vulnerability])])
+    backend.close()
+
+    resumed = StagingBackend(str(tmp_path), resume=True)
+    resumed.write([("Vulnerability", [vulnerability])])
+    resumed.close()
+    assert len(read_csv(tmp_path, "vulnerabilities.csv")) == 2  # cabecera y una fila
+
+    fresh = StagingBackend(str(tmp_path))
+    assert not (tmp_path / "vulnerabilities.csv").exists()
+    fresh.write([("Vulnerability", [vulnerability])])
+    fresh.close()
+    assert len(read_csv(tmp_path, "vulnerabilities.csv")) == 2  # cabecera y una fila
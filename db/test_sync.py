@@ -0,0 +1,20 @@
+from sync import ChangeDetector
+
+
+def test_shared_vulnerability_is_counted_once():
+    detector = ChangeDetector({"vulnerability": {"old": "h1"}})
+    # La misma vulnerabilidad aparece en tres versiones de WordPress del lote
+    for _ in range(3):
+        assert detector.classify("vulnerability", "shared", "h2") == "new"
+        assert detector.classify("vulnerability", "old", "h1") == "unchanged"
+    assert detector.classify("vulnerability", "other", "h3") == "new"
+
+    assert detector.report() == {"vulnerability": {"new": 2, "changed": 0, "unchanged": 1}}
+
+
+def test_commit_updates_known_hashes():
+    detector = ChangeDetector()
+    assert detector.classify("plugin", "akismet", "h1") == "new"
+    detector.commit("plugin", {"akismet": "h1"})
+    assert detector.classify("plugin", "akismet", "h1") == "unchanged"
+    assert detector.classify("plugin", "akismet", "h2") == "changed"
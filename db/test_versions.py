@@ -0,0 +1,36 @@
+import pytest
+
+from versions import matches_range, version_key
+
+# Cada versión es menor que la siguiente según packaging.version
+ORDERED = [
+    "0.9", "1.0.dev1", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1",
+    "1.0.1", "1.2", "1.9", "1.10", "1.10.0.1", "2.0", "10.0",
+]
+
+
+def test_keys_sort_like_packaging():
+    keys = [version_key(v) for v in ORDERED]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.parametrize("a, b", [("1.0", "1.0.0"), ("2.3.1 (build 5)", "2.3.1"), ("v1.2 build 5", "1.2")])
+def test_equivalent_versions_share_key(a, b):
+    assert version_key(a) == version_key(b)
+
+
+def test_normalised_pre_releases_sort_before_the_release():
+    assert version_key("2.3.1-beta") == version_key("2.3.1b0") < version_key("2.3.1")
+
+
+@pytest.mark.parametrize("value", [None, "", "   ", "trunk"])
+def test_unparseable_versions_have_no_key(value):
+    assert version_key(value) is None
+
+
+def test_matches_range():
+    assert matches_range("1.9", introduced_in="1.0", fixed_in="1.10")
+    assert not matches_range("1.10", fixed_in="1.10")
+    assert not matches_range("0.9", introduced_in="1.0")
+    assert matches_range("5.0", fixed_in="no-es-una-version")
@@ -0,0 +1,76 @@
+import re
+
+# Componentes de la versión que se codifican y anchura de cada uno
+RELEASE_PARTS = 5
+WIDTH = 6
+MAX_PART = 10 ** WIDTH - 1
+
+PRE_RANK = {"a": "1", "b": "2", "rc": "3"}
+
+_NUMERIC_PREFIX = re.compile(r"\d+(?:\.\d+)*")
+
+
+def parse_version(value):
+    """
+    Interpreta una versión con packaging.version. Si no es PEP 440 válida (por ejemplo
+    "2.3.1-beta" o "v1.2 build 5") se usa el prefijo numérico que contenga.
+    Devuelve None si no hay nada que interpretar.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    # Se importa tarde: los módulos que solo importan versions no cargan packaging al arrancar
+    from packaging.version import Version, InvalidVersion
+
+    try:
+        return Version(text)
+    except InvalidVersion:
+        match = _NUMERIC_PREFIX.search(text)
+        if not match:
+            return None
+        return Version(match.group(0))
+
+
+def _part(number):
+    return f"{min(int(number), MAX_PART):0{WIDTH}d}"
+
+
+def version_key(value):
+    """
+    Devuelve una clave de texto de anchura fija cuyo orden lexicográfico coincide con
+    el orden de packaging.version (1.10 > 1.9, 1.0rc1 < 1.0 < 1.0.post1), de modo que
+    Neo4j puede compararla y usar un índice de rango sobre ella.
+    Devuelve None si la versión no se puede interpretar.
+    """
+    v = parse_version(value)
+    if v is None:
+        return None
+
+    release = (tuple(v.release) + (0,) * RELEASE_PARTS)[:RELEASE_PARTS]
+
+    # Mismo orden que packaging: dev sin pre/post < pre-releases < final, y post/dev después
+    if v.pre is None and v.post is None and v.dev is not None:
+        pre = "0" + _part(0)
+    elif v.pre is None:
+        pre = "9" + _part(0)
+    else:
+        pre = PRE_RANK[v.pre[0]] + _part(v.pre[1])
+    post = "0" + _part(0) if v.post is None else "1" + _part(v.post)
+    dev = "9" + _part(0) if v.dev is None else "0" + _part(v.dev)
+
+    return ":".join([_part(v.epoch)[-3:], ".".join(_part(p) for p in release), pre, post, dev])
+
+
+def matches_range(version, introduced_in=None, fixed_in=None):
+    """
+    Indica si 'version' está dentro del rango [introduced_in, fixed_in). Un límite
+    ausente o que no se puede interpretar se considera abierto.
+    """
+    key = version_key(version)
+    if key is None:
+        return True
+    introduced_key = version_key(introduced_in)
+    fixed_key = version_key(fixed_in)
+    return (introduced_key is None or introduced_key <= key) and (fixed_key is None or key < fixed_key)
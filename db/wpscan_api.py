@@ -1,46 +1,139 @@
-import requests
 import re
-from bs4 import BeautifulSoup
-from settings import BASE_URL, API_KEY
-from packaging import version as packaging_version
+from settings import BASE_URL, API_KEY, HTTP_WORKERS, HTTP_TIMEOUT, HTTP_MAX_RETRIES, WPSCAN_REQUESTS_PER_SECOND, WPSCAN_DAILY_QUOTA
+from settings import HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTLS
+from http_client import HttpClient
+from http_cache import HttpCache
+from metrics import metrics
+
+# Caché de respuestas compartida por los dos clientes (None la desactiva). Igual que
+# los clientes, no abre el fichero ni crea sesiones HTTP hasta la primera petición,
+# así que importar este módulo no tiene efectos secundarios.
+http_cache = HttpCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES) if HTTP_CACHE_PATH else None
 
 class WPScanAPI:
     def __init__(self):
         self.base_url = BASE_URL
         self.api_key = API_KEY
+        self.client = HttpClient(
+            workers=HTTP_WORKERS,
+            rate=WPSCAN_REQUESTS_PER_SECOND,
+            daily_quota=WPSCAN_DAILY_QUOTA,
+            headers={"Authorization": f"Token token={API_KEY}"},
+            timeout=HTTP_TIMEOUT,
+            max_retries=HTTP_MAX_RETRIES,
+            cache=http_cache,
+            name="wpscan",
+            # WPScan responde 429 cuando se agota la cuota diaria del plan
+            quota_status=429,
+        )
+
+    def refresh_quota(self):
+        """
+        Consulta en /status las peticiones que quedan hoy en el plan de WPScan (la
+        consulta no gasta cuota) y actualiza con ellas el contador del cliente, de
+        modo que una segunda ejecución del mismo día no cuenta con la cuota entera.
+        Si no se puede consultar se mantiene el contador local (WPSCAN_DAILY_QUOTA).
+        Devuelve las peticiones restantes, o None si no hay límite.
+        """
+        try:
+            response = self.client.get(f"{self.base_url}/status", quota=False)
+        except OSError as e:
+            print(f"No se pudo consultar la cuota de WPScan: {e}")
+            return self.client.quota_remaining
+        if response.status_code != 200:
+            print(f"Error {response.status_code}: No se pudo consultar la cuota de WPScan.")
+            return self.client.quota_remaining
+
+        remaining = response.json().get("requests_remaining")
+        # Los planes sin límite no informan de un número de peticiones positivo
+        self.client.set_quota(remaining if isinstance(remaining, int) and remaining >= 0 else None)
+        print(f"Cuota de WPScan: quedan {remaining} peticiones hoy.")
+        return self.client.quota_remaining
 
+    @metrics.instrument("wpscan.get_wordpress_version")
     def get_wordpress_version(self, version):
         """
         Obtiene los detalles de una versión específica de WordPress desde la API de WPScan.
+        Devuelve None si la versión no existe (404); cualquier otro error lanza HTTPError.
         """
         url = f"{self.base_url}/wordpresses/{version}"
-        headers = {"Authorization": f"Token token={API_KEY}"}
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error {response.status_code}: No se pudo obtener la versión {version}, {response.text}")
+        response = self.client.get(url, ttl=HTTP_CACHE_TTLS.get("wpscan_wordpress"))
+
+        if response.status_code == 404:
+            print(f"Error 404: No se pudo obtener la versión {version}, {response.text}")
             return None
+        response.raise_for_status()
+        return response.json()
 
+    @metrics.instrument("wpscan.get_plugin")
     def get_plugin(self, plugin_slug):
         """
         Obtiene los detalles de un plugin específicow desde la API de WPScan.
+        Devuelve None si el plugin no existe (404); cualquier otro error lanza HTTPError.
         """
         url = f"{self.base_url}/plugins/{plugin_slug}"
-        headers = {"Authorization": f"Token token={API_KEY}"}
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error {response.status_code}: No se pudo obtener el plugin {plugin_slug}")
+        response = self.client.get(url, ttl=HTTP_CACHE_TTLS.get("wpscan_plugin"))
+
+        if response.status_code == 404:
+            print(f"Error 404: No se pudo obtener el plugin {plugin_slug}")
             return None
+        response.raise_for_status()
+        return response.json()
+
+class PluginRecord:
+    """
+    Registro compacto de un plugin del catálogo de wordpress.org con solo los campos
+    que usa la ingesta. Admite plugin.get("campo") para poder pasarse a las mismas
+    funciones que los diccionarios de la API.
+    """
+    __slots__ = ("slug", "requires", "tested", "last_updated", "active_installs", "downloaded",
+                 "name", "version", "author", "rating", "num_ratings", "homepage", "short_description")
+
+    def __init__(self, slug, requires=None, tested=None, last_updated=None, active_installs=None, downloaded=None,
+                 name=None, version=None, author=None, rating=None, num_ratings=None, homepage=None,
+                 short_description=None):
+        self.slug = slug
+        self.requires = requires
+        self.tested = tested
+        self.last_updated = last_updated
+        self.active_installs = active_installs
+        self.downloaded = downloaded
+        # Metadatos que se vuelcan en el nodo Plugin (ver enrichment.py)
+        self.name = name
+        self.version = version
+        self.author = author
+        self.rating = rating
+        self.num_ratings = num_ratings
+        self.homepage = homepage
+        self.short_description = short_description
+
+    @classmethod
+    def from_api(cls, data):
+        # La API devuelve False en lugar de null para algunos campos vacíos
+        values = {name: data.get(name) for name in cls.__slots__}
+        return cls(**{name: None if value is False else value for name, value in values.items()})
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None)
+        return default if value is None else value
+
 class WordpressAPI:
+    # Campos pesados que query_plugins devuelve por defecto y que la ingesta no usa
+    UNUSED_FIELDS = [
+        "description", "sections", "icons", "banners", "tags",
+        "ratings", "screenshots", "versions", "contributors", "donate_link",
+        "download_link", "compatibility", "support_threads", "support_threads_resolved",
+        "author_profile", "requires_plugins", "added",
+    ]
+
     def __init__(self):
         self.base_url = "https://api.wordpress.org/plugins/info/1.2/"
+        self.releases_url = "https://wordpress.org/download/releases/"
         self.per_page = 250  # Máximo permitido
+        self.client = HttpClient(workers=HTTP_WORKERS, timeout=HTTP_TIMEOUT, max_retries=HTTP_MAX_RETRIES, cache=http_cache,
+                                 name="wordpress_org")
 
+    @metrics.instrument("wordpress_org.get_all_plugins")
     def get_all_plugins(self):
         page = 1
         all_plugins = []
@@ -66,7 +159,7 @@ class WordpressAPI:
             for campo in campos:
                 params[f"request[fields][{campo}]"] = True
 
-            response = requests.get(self.base_url, params=params)
+            response = self.client.get(self.base_url, params=params, ttl=HTTP_CACHE_TTLS.get("wordpress_plugins"))
             if response.status_code != 200:
                 print(f"Error en la petición: {response.status_code}")
                 break
@@ -79,17 +172,64 @@ class WordpressAPI:
             all_plugins.extend(data["plugins"])
             page += 1
         return all_plugins
+
+    @metrics.instrument("wordpress_org.get_plugins_page")
+    def _get_plugins_page(self, page):
+        """Descarga una página del catálogo pidiendo solo los campos de PluginRecord."""
+        params = {
+            "action": "query_plugins",
+            "request[page]": page,
+            "request[per_page]": self.per_page,
+        }
+        for campo in PluginRecord.__slots__:
+            params[f"request[fields][{campo}]"] = True
+        for campo in self.UNUSED_FIELDS:
+            params[f"request[fields][{campo}]"] = False
+
+        response = self.client.get(self.base_url, params=params, ttl=HTTP_CACHE_TTLS.get("wordpress_plugins"))
+        if response.status_code != 200:
+            print(f"Error {response.status_code}: No se pudo obtener la página {page} de plugins.")
+            return None
+        return response.json()
+
+    def iter_plugins(self):
+        """
+        Recorre el catálogo de wordpress.org como un generador de PluginRecord.
+
+        La primera página indica en su bloque 'info' el número total de páginas; el
+        resto se descargan en paralelo y cada registro se entrega en cuanto llega, así
+        que la memoria usada no depende del tamaño del catálogo.
+        """
+        first = self._get_plugins_page(1)
+        if not first:
+            return
+        pages = int(first.get("info", {}).get("pages") or 1)
+        print(f"El catálogo de wordpress.org tiene {pages} páginas.")
+        for plugin in first.get("plugins") or []:
+            yield PluginRecord.from_api(plugin)
+        del first
+
+        for page, data in self.client.map(self._get_plugins_page, range(2, pages + 1)):
+            if not data:
+                continue
+            for plugin in data.get("plugins") or []:
+                yield PluginRecord.from_api(plugin)
+    @metrics.instrument("wordpress_org.get_all_versions")
     def get_all_versions(self):
         """
         Scrapea la página oficial de WordPress con el archivo histórico de versiones
         y devuelve una lista completa filtrada con versiones solo del tipo n.n.n.
         """
-        url = "https://wordpress.org/download/releases/"
-        response = requests.get(url)
+        url = self.releases_url
+        response = self.client.get(url, ttl=HTTP_CACHE_TTLS.get("wordpress_releases"))
         if response.status_code != 200:
             print(f"Error {response.status_code}: No se pudo obtener las versiones.")
             return []
 
+        # Solo se necesitan aquí: se importan tarde para que arrancar sea rápido
+        from bs4 import BeautifulSoup
+        from packaging import version as packaging_version
+
         soup = BeautifulSoup(response.text, "html.parser")
         versions_set = set()
 
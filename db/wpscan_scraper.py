@@ -1,10 +1,159 @@
+import json
+import os
+import queue
+import threading
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+from http_client import HttpClient
+from metrics import metrics
+from settings import SLUG_HARVEST_MODE, HARVEST_WORKERS, HARVEST_REQUESTS_PER_SECOND, HARVEST_CHECKPOINT, HTTP_TIMEOUT, HTTP_MAX_RETRIES
 
+BASE_URL = "https://wpscan.com/plugins"
+FILTERS = [None] + list("abcdefghijklmnopqrstuvwxyz")
+
+def filter_url(f, page):
+    """URL de la página 'page' del listado de WPScan para el filtro 'f' (None = 0-9)."""
+    if f is None:
+        return f"{BASE_URL}?page={page}&get"
+    if page == 1:
+        return f"{BASE_URL}?get={f}"
+    return f"{BASE_URL}?page={page}&get={f}"
+
+def parse_listing(html):
+    """
+    Extrae de una página del listado los slugs de la tabla de vulnerabilidades y el
+    número de página más alto que aparece en la paginación.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    slugs = []
+    for link in soup.select("div.vulnerabilities__table--row div.vulnerabilities__table--slug a"):
+        slug = link.get_text(strip=True)
+        if slug:
+            slugs.append(slug)
+    page_numbers = [int(a.get_text(strip=True)) for a in soup.select("ul.vulnerabilities__pagination li a")
+                    if a.get_text(strip=True).isdigit()]
+    return slugs, max(page_numbers) if page_numbers else 1
+
+class HarvestCheckpoint:
+    """
+    Diario de progreso del rastreo en formato JSONL: una línea por página terminada
+    con el filtro, la página, el total de páginas del filtro y sus slugs. Permite
+    retomar un rastreo interrumpido sin volver a descargar lo ya procesado.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.pages = {}
+        self.slugs = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Línea a medio escribir de un rastreo que se cortó
+                    self.done.add((entry["filter"], entry["page"]))
+                    self.pages[entry["filter"]] = entry["pages"]
+                    self.slugs.update(entry["slugs"])
+
+    def record(self, filtro, page, pages, slugs):
+        if not self.path:
+            return
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"filter": filtro, "page": page, "pages": pages, "slugs": slugs}) + "\n")
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def harvest_slugs(workers=HARVEST_WORKERS, checkpoint_path=HARVEST_CHECKPOINT, rate=HARVEST_REQUESTS_PER_SECOND):
+    """
+    Recorre el listado de plugins de WPScan por HTTP, sin navegador, con un hilo por
+    filtro (0-9, a, ..., z) y hasta 'workers' filtros a la vez.
+
+    Es un generador: cada slug se entrega una sola vez, en cuanto se descubre. El
+    progreso se anota en 'checkpoint_path'; si existe de un rastreo interrumpido se
+    reanudan solo las páginas pendientes (y primero se entregan los slugs ya
+    encontrados). Al terminar el rastreo completo se borra el checkpoint.
+    """
+    client = HttpClient(workers=workers, rate=rate, timeout=HTTP_TIMEOUT, max_retries=HTTP_MAX_RETRIES,
+                        name="wpscan_com")
+    checkpoint = HarvestCheckpoint(checkpoint_path)
+    found = queue.Queue()
+    finished = object()
+
+    def fetch(filtro, f, page):
+        url = filter_url(f, page)
+        response = client.get(url)
+        if response.status_code != 200:
+            print(f"Error {response.status_code}: No se pudo cargar {url}")
+            return None, None
+        return parse_listing(response.text)
+
+    def harvest_filter(f):
+        filtro = f if f is not None else "0-9"
+        try:
+            pages = checkpoint.pages.get(filtro)
+            if pages is None:
+                slugs, pages = fetch(filtro, f, 1)
+                if slugs is None:
+                    return False
+                print("Filtro:", filtro, "tiene máximo de páginas:", pages)
+                checkpoint.record(filtro, 1, pages, slugs)
+                found.put(slugs)
+            for page in range(2, pages + 1):
+                if (filtro, page) in checkpoint.done:
+                    continue
+                slugs, _ = fetch(filtro, f, page)
+                if slugs is None:
+                    return False
+                if not slugs:
+                    print(f"No se encontraron filas en la página {page} del filtro {filtro}.")
+                    break
+                checkpoint.record(filtro, page, pages, slugs)
+                found.put(slugs)
+            return True
+        except Exception as e:
+            print(f"Error procesando el filtro {filtro}: {e}")
+            raise
+        finally:
+            found.put(finished)
+
+    seen = set(checkpoint.slugs)
+    if seen:
+        print(f"Reanudando el rastreo: {len(seen)} slugs ya extraídos.")
+        yield from seen
+
+    failed = False
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(harvest_filter, f) for f in FILTERS]
+        pending = len(futures)
+        while pending:
+            slugs = found.get()
+            if slugs is finished:
+                pending -= 1
+                continue
+            for slug in slugs:
+                if slug not in seen:
+                    seen.add(slug)
+                    yield slug
+        for future in futures:
+            if future.exception() is not None or not future.result():
+                failed = True
+
+    if not failed:
+        checkpoint.clear()
+    print(f"Se han extraído {len(seen)} slugs distintos.")
+
+@metrics.instrument("scraper.extract_slugs")
 def extract_slugs():
     """
     Para cada filtro (0-9, a, b, …, z), se carga la primera página para extraer el
@@ -13,13 +162,22 @@ def extract_slugs():
     de cada fila de la tabla de vulnerabilidades.
     
     Devuelve una lista con todos los slugs extraídos.
+
+    Es el modo antiguo, con Chrome headless; solo se usa como alternativa a
+    harvest_slugs cuando el listado no se puede leer por HTTP.
     """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     options = Options()
     options.add_argument("--headless")
     driver = webdriver.Chrome(options=options)
     all_slugs = []
-    base_url = "https://wpscan.com/plugins"
-    filters = [None] + list("abcdefghijklmnopqrstuvwxyz")
+    base_url = BASE_URL
+    filters = FILTERS
 
     for f in filters:
         filtro = f if f is not None else "0-9"
@@ -60,7 +218,8 @@ def extract_slugs():
                 else:
                     url = f"{base_url}?page={page}&get={f}"
             print("Abriendo URL:", url)
-            driver.get(url)
+            with metrics.timer("scraper.selenium_page"):
+                driver.get(url)
             try:
                 WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "div.vulnerabilities__table--body"))
@@ -86,8 +245,18 @@ def extract_slugs():
     driver.quit()
     return all_slugs
 
-if __name__ == "__main__":
-    print(list(set(extract_slugs())))
-
-def extract_plugins():
+def extract_plugins(mode=SLUG_HARVEST_MODE):
+    """
+    Devuelve la lista de slugs de WPScan sin duplicados. En modo "http" se usa
+    harvest_slugs y, si no obtiene ningún slug, se recurre a Selenium; en modo
+    "selenium" se usa directamente extract_slugs.
+    """
+    if mode == "http":
+        slugs = list(harvest_slugs())
+        if slugs:
+            return slugs
+        print("El rastreo por HTTP no ha devuelto slugs. Se usará Selenium.")
     return list(set(extract_slugs()))
+
+if __name__ == "__main__":
+    print(extract_plugins())
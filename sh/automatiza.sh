@@ -4,6 +4,6 @@ PYTHON="/usr/local/bin/python3"
 SCRIPT="db/populate_db.py"
 open -a "$NEO4J_APP"
 sleep 30
-$PYTHON "$SCRIPT"
+$PYTHON "$SCRIPT" --resume
 wait
 sudo shutdown -h now